@@ -0,0 +1,86 @@
+import glob
+import json
+import os
+import random
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# the solvers import each other from src/ (symbolic_solvers...) and the Prover9 ones from the root (src.symbolic_solvers...)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+# cache_tag of the Pyke programs the tests compile, keeps their directories apart from the ones of real runs
+PYKE_CACHE_TAG = 'test'
+
+
+def sample_programs(key):
+    """the `key` programs of the examples in sample_data/"""
+    programs = []
+    for path in sorted(glob.glob(os.path.join(ROOT, 'sample_data', '*.json'))):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except ValueError:
+            continue
+        for example in data if isinstance(data, list) else []:
+            if isinstance(example, dict) and example.get(key):
+                programs.append(example[key][0])
+    return programs
+
+
+def fol_formulas():
+    """the distinct premises and conclusions of the sample FOL programs and of synthetic ones of nesting 1 to 3"""
+    from synthetic_workload import generate_fol
+
+    programs = sample_programs('FOL')
+    programs += [generate_fol(n_premises=8, nesting=nesting, seed=seed)[0] for seed in range(40) for nesting in (1, 2, 3)]
+    formulas = {}
+    for program in programs:
+        premises, conclusion = program.split('Conclusion:')
+        for line in premises.split('Premises:')[1].strip().split('\n') + conclusion.strip().split('\n')[:1]:
+            formulas.setdefault(line.split(':::')[0].strip())
+    return list(formulas)
+
+
+def random_lp_program(rng):
+    """a small LP program over unary and binary predicates, with constants and variables mixed in the rules"""
+    entities = ['Anne', 'Bob', 'Cat', 'Dog']
+    predicates = [('Big', 1), ('Red', 1), ('Likes', 2), ('Chases', 2), ('Nice', 1)]
+
+    def atom(variables):
+        name, arity = rng.choice(predicates)
+        args = [rng.choice(['$x', '$y', '$x']) if variables and rng.random() < 0.6 else rng.choice(entities)
+                for _ in range(arity)]
+        return f"{name}({', '.join(args + [rng.choice(['True', 'True', 'False'])])})"
+
+    facts = [atom(False) for _ in range(rng.randint(1, 14))]
+    rules = [' && '.join(atom(True) for _ in range(rng.randint(1, 3))) + ' >>> ' +
+             ' && '.join(atom(True) for _ in range(rng.randint(1, 2))) for _ in range(rng.randint(1, 7))]
+    return ('Predicates:\n' + '\n'.join(f'{name}($x, bool) ::: Is x {name.lower()}?' for name, _ in predicates) +
+            '\nFacts:\n' + '\n'.join(f'{fact} ::: fact' for fact in facts) +
+            '\nRules:\n' + '\n'.join(f'{rule} ::: rule' for rule in rules) +
+            f'\nQuery:\n{atom(False)} ::: query')
+
+
+@pytest.fixture(scope='session')
+def lp_programs():
+    """the sample LP programs, synthetic ones of growing depth and random ones with binary predicates"""
+    from synthetic_workload import generate_lp
+
+    rng = random.Random(7)
+    programs = sample_programs('LP')
+    programs += [generate_lp(n_entities=rng.randint(2, 8), n_predicates=rng.randint(3, 10),
+                             n_rules=rng.randint(3, 12), depth=rng.randint(1, 6), seed=i)[0] for i in range(40)]
+    programs += [random_lp_program(rng) for _ in range(160)]
+    return programs
+
+
+@pytest.fixture(scope='session', autouse=True)
+def remove_pyke_caches():
+    yield
+    pyke_dir = os.path.join(ROOT, 'src', 'symbolic_solvers', 'pyke_solver')
+    for path in glob.glob(os.path.join(pyke_dir, f'.cache_program_{PYKE_CACHE_TAG}*')):
+        shutil.rmtree(path, ignore_errors=True)
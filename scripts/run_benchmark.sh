@@ -0,0 +1,3 @@
+#!/bin/bash
+set -e
+python src/benchmark.py --scales small medium --examples 20 --output_file benchmark_results.json "$@"
@@ -0,0 +1,383 @@
+"""
+end-to-end throughput benchmark on synthetic workloads
+
+for every scale and solver key a fresh process generates programs with `synthetic_workload`, runs them
+through LogicInferenceEngine and measures throughput, p50/p95/p99 latency and peak RSS, both of the
+process itself and of the solver subprocesses it launched (prover9, the Z3 scripts); an end-to-end pass
+over examples holding all four programs is measured the same way, as is the wall-clock time of a
+logic_inference.py run per --solvers selection (startup alone, and startup plus one example);
+the native LP engine is timed against Pyke, compiling every program or reusing the compiled rule bases,
+the cost of the LP reasoning trace is measured against answer-only runs, goal-directed LP evaluation
+against the full closure, and the size of the LP reasoning given as a proof against the full trace;
+the FOL parse and Prover9 translation are timed per formula; results are written as JSON
+
+    python src/benchmark.py --scales small medium --examples 20 --output_file benchmark_results.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import shlex
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from logic_inference import PROGRAM_CLASS, SOLVER_KEYS, LogicInferenceEngine, load_program_class, parse_args
+from synthetic_workload import GENERATORS, generate_examples
+
+
+# generator keyword arguments per solver key, see synthetic_workload for their meaning
+SCALES = {
+    'small': {
+        'LP': {'n_entities': 4, 'n_predicates': 6, 'n_rules': 6, 'depth': 3},
+        'FOL': {'n_premises': 4, 'nesting': 1},
+        'CSP': {'n_variables': 5, 'domain_size': 5},
+        'SAT': {'n_people': 5, 'n_slots': 5, 'n_options': 5},
+    },
+    'medium': {
+        'LP': {'n_entities': 20, 'n_predicates': 16, 'n_rules': 20, 'depth': 8},
+        'FOL': {'n_premises': 10, 'nesting': 2},
+        'CSP': {'n_variables': 7, 'domain_size': 7},
+        'SAT': {'n_people': 10, 'n_slots': 10, 'n_options': 5},
+    },
+    'large': {
+        'LP': {'n_entities': 60, 'n_predicates': 40, 'n_rules': 60, 'depth': 20},
+        'FOL': {'n_premises': 20, 'nesting': 3},
+        'CSP': {'n_variables': 8, 'domain_size': 10},
+        'SAT': {'n_people': 25, 'n_slots': 25, 'n_options': 5},
+    },
+}
+
+
+def percentile(values, q):
+    """nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))  # ceil
+    return ordered[int(rank) - 1]
+
+
+def peak_rss_mb():
+    """peak resident set size of this process and of its (waited for) children, ru_maxrss is in KB on Linux"""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return {'process': round(own, 1), 'subprocesses': round(children, 1)}
+
+
+def summarize(latencies, total_seconds):
+    return {
+        'throughput_per_s': round(len(latencies) / total_seconds, 3) if total_seconds > 0 else None,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50) * 1000, 2),
+            'p95': round(percentile(latencies, 95) * 1000, 2),
+            'p99': round(percentile(latencies, 99) * 1000, 2),
+            'mean': round(sum(latencies) / len(latencies) * 1000, 2),
+        },
+    }
+
+
+def run_solver(key, params, n_examples, seed, engine_argv):
+    """solve `n_examples` synthetic programs of one solver, meant to run in a fresh process"""
+    engine = LogicInferenceEngine(parse_args(engine_argv), load_dataset=False)
+    latencies, statuses, correct = [], Counter(), 0
+    for i in range(n_examples):
+        program, expected = GENERATORS[key](seed=seed * 100003 + i, **params)
+        start = time.perf_counter()
+        answer, status_code, _, _, _ = engine.safe_execute_program(key, program, f'synthetic_{i:05d}')
+        latencies.append(time.perf_counter() - start)
+        statuses[status_code] += 1
+        correct += status_code == 'success' and answer == expected
+    return {
+        'examples': n_examples,
+        'status_counts': dict(statuses),
+        'correct': correct,
+        **summarize(latencies, sum(latencies)),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def run_end_to_end(sizes, n_examples, seed, engine_argv):
+    """run whole examples (all four programs) through the engine, meant to run in a fresh process"""
+    engine = LogicInferenceEngine(parse_args(engine_argv), load_dataset=False)
+    examples = generate_examples(n_examples, sizes, seed)
+    latencies, correct = [], Counter()
+    for example in examples:
+        start = time.perf_counter()
+        record = engine.process_example(example)
+        latencies.append(time.perf_counter() - start)
+        for key in engine.solver_keys:
+            correct[key] += (record[f'{key}_status_code'] == 'success'
+                             and record[f'{key}_predicted_answer'] == example['answer'][key])
+    return {
+        'examples': n_examples,
+        'correct': dict(correct),
+        **summarize(latencies, sum(latencies)),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def run_trace_overhead(params, n_examples, seed, repeats=3):
+    """
+    mean ms per LP program traced (reasoning string built) and answer-only (no tracer for Pyke),
+    per backend; every program is run once before timing so that Pyke's rule bases are compiled already.
+    meant to run in a fresh process
+    """
+    program_class = load_program_class('LP')
+    programs = [GENERATORS['LP'](seed=seed * 100003 + i, **params)[0] for i in range(n_examples)]
+    results = {}
+    for backend in ('pyke', 'native'):
+        ms = {}
+        for trace in (False, True):
+            for program in programs:
+                program_class(program, PROGRAM_CLASS['LP'][2], backend=backend, trace=trace).execute_program()
+            start = time.perf_counter()
+            for _ in range(repeats):
+                for program in programs:
+                    program_class(program, PROGRAM_CLASS['LP'][2], backend=backend, trace=trace).execute_program()
+            ms['traced' if trace else 'answer_only'] = (time.perf_counter() - start) / (repeats * n_examples) * 1000
+        results[backend] = {'answer_only_ms': round(ms['answer_only'], 3), 'traced_ms': round(ms['traced'], 3),
+                            'overhead_pct': round((ms['traced'] / ms['answer_only'] - 1) * 100, 1)}
+    return results
+
+
+def run_lp_backends(params, n_examples, seed, repeats=3):
+    """
+    mean ms per traced LP program on Pyke compiling every program (as before the native engine, whose
+    rule bases were compiled per program), on Pyke with the rule bases compiled already and on the native
+    engine, checking that the three agree on the answers; meant to run in a fresh process
+    """
+    from symbolic_solvers.pyke_solver import pyke_solver
+
+    program_class = load_program_class('LP')
+    programs = [GENERATORS['LP'](seed=seed * 100003 + i, **params)[0] for i in range(n_examples)]
+    runs = {'pyke_uncached': ('pyke', True), 'pyke_cached': ('pyke', False), 'native': ('native', False)}
+    ms, answers = {}, {}
+    for name, (backend, uncached) in runs.items():
+        for program in programs:  # imports and warms up the backend, and compiles the rule bases
+            program_class(program, PROGRAM_CLASS['LP'][2], backend=backend).execute_program()
+        answers[name] = []
+        start = time.perf_counter()
+        for _ in range(repeats):
+            for program in programs:
+                if uncached:
+                    pyke_solver._compiled_engines.clear()
+                answers[name].append(program_class(program, PROGRAM_CLASS['LP'][2], backend=backend)
+                                     .execute_program()[0])
+        ms[name] = (time.perf_counter() - start) / (repeats * n_examples) * 1000
+    return {
+        **{f'{name}_ms': round(value, 3) for name, value in ms.items()},
+        'speedup_vs_uncached': round(ms['pyke_uncached'] / ms['native'], 1),
+        'speedup_vs_cached': round(ms['pyke_cached'] / ms['native'], 1),
+        'answers_agree': answers['pyke_uncached'] == answers['pyke_cached'] == answers['native'],
+    }
+
+
+def run_goal_directed(params, n_examples, seed, repeats=3):
+    """
+    the native LP engine on the whole program vs goal-directed on the query: mean ms per program, and how
+    much of the closure the goal-directed runs skipped (derived facts, rules), meant to run in a fresh process
+    """
+    from symbolic_solvers.pyke_solver.fc_engine import ForwardChainingEngine
+
+    program_class = load_program_class('LP')
+    programs = [GENERATORS['LP'](seed=seed * 100003 + i, **params)[0] for i in range(n_examples)]
+    ms = {}
+    for backend in ('native', 'goal'):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            for program in programs:
+                program_class(program, PROGRAM_CLASS['LP'][2], backend=backend).execute_program()
+        ms[backend] = (time.perf_counter() - start) / (repeats * n_examples) * 1000
+
+    derived = {'native': 0, 'goal': 0}
+    rules = {'native': 0, 'goal': 0}
+    early = 0
+    for program in programs:
+        full = program_class(program, PROGRAM_CLASS['LP'][2], backend='native')
+        engine = ForwardChainingEngine(full.native_facts, full.native_rules)
+        engine.activate()
+        full_derived = sum(len(fact_list.facts) for fact_list in engine.fact_lists.values()) - len(set(full.native_facts))
+        derived['native'] += full_derived
+        rules['native'] += len(full.native_rules)
+        goal = program_class(program, PROGRAM_CLASS['LP'][2], backend='goal')
+        goal.execute_program()
+        # no goal_stats when the program fell back to the whole closure
+        stats = getattr(goal, 'goal_stats', None) or {'derived': full_derived, 'rules': len(full.native_rules),
+                                                      'stopped_early': False}
+        derived['goal'] += stats['derived']
+        rules['goal'] += stats['rules']
+        early += stats['stopped_early']
+    return {
+        'native_ms': round(ms['native'], 3), 'goal_ms': round(ms['goal'], 3),
+        'derived_facts': derived, 'rules_evaluated': rules, 'stopped_early': early,
+        'closure_skipped_pct': round((1 - derived['goal'] / derived['native']) * 100, 1) if derived['native'] else 0.0,
+    }
+
+
+def run_proof_size(params, n_examples, seed):
+    """
+    mean characters of the LP reasoning per program: the full trace, the proof of the query facts and the
+    proof of every implied fact (see proof_dag), meant to run in a fresh process
+    """
+    program_class = load_program_class('LP')
+    programs = [GENERATORS['LP'](seed=seed * 100003 + i, **params)[0] for i in range(n_examples)]
+    chars = {}
+    for proof in (None, 'query', 'closure'):
+        reasoning = [program_class(program, PROGRAM_CLASS['LP'][2], proof=proof).execute_program()[2]
+                     for program in programs]
+        chars[proof or 'trace'] = sum(map(len, reasoning)) / n_examples
+    return {
+        'trace_chars': round(chars['trace']), 'query_proof_chars': round(chars['query']),
+        'closure_proof_chars': round(chars['closure']),
+        'query_reduction_pct': round((1 - chars['query'] / chars['trace']) * 100, 1),
+        'closure_reduction_pct': round((1 - chars['closure'] / chars['trace']) * 100, 1),
+    }
+
+
+def run_fol_translate(params, n_examples, seed, repeats=3):
+    """
+    mean ms per FOL formula (premises and conclusion) of the two parsing stages of the Prover9 solver, the
+    FOL parse and the translation to Prover9 syntax, and the one-time cost of the first translation (the
+    parser tables are built then); meant to run in a fresh process
+    """
+    program_class = load_program_class('FOL')
+    programs = [GENERATORS['FOL'](seed=seed * 100003 + i, **params)[0] for i in range(n_examples)]
+    # programs are parsed when they are created
+    start = time.perf_counter()
+    program_class(programs[0], PROGRAM_CLASS['FOL'][2])
+    first_ms = (time.perf_counter() - start) * 1000
+    seconds = {'fol_parse': 0.0, 'ply_translate': 0.0}
+    n_formulas = 0
+    for _ in range(repeats):
+        for program in programs:
+            parsed = program_class(program, PROGRAM_CLASS['FOL'][2])
+            for stage in seconds:
+                seconds[stage] += parsed.timings.get(stage, 0.0)
+            n_formulas += len(getattr(parsed, 'prover9_premises', ())) + 1
+    return {
+        'formulas': n_formulas // repeats, 'first_program_ms': round(first_ms, 3),
+        'fol_parse_ms': round(seconds['fol_parse'] / n_formulas * 1000, 4),
+        'translate_ms': round(seconds['ply_translate'] / n_formulas * 1000, 4),
+    }
+
+
+def run_cli(selection, input_file, output_file, engine_argv):
+    """wall-clock seconds of one logic_inference.py run restricted to the solver keys in `selection`"""
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    command = [sys.executable, os.path.join(src_dir, 'logic_inference.py'), '--input_file', input_file,
+               '--output_file', output_file, '--solvers', *selection, *engine_argv]
+    start = time.perf_counter()
+    # run from the repository root, where the engine cleans up its solver caches
+    subprocess.run(command, cwd=os.path.dirname(src_dir), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                   check=True)
+    return time.perf_counter() - start
+
+
+def measure_startup(solver_keys, repeats, engine_argv):
+    """
+    median wall-clock time of the CLI on an empty input (interpreter and engine start up, no backend is
+    imported) and on a single small example (which imports and runs the selected backends), for all
+    `solver_keys` together and for each of them alone
+    """
+    selections = [solver_keys] + [[key] for key in solver_keys] if len(solver_keys) > 1 else [solver_keys]
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        empty_input, one_example = os.path.join(tmp_dir, 'empty.json'), os.path.join(tmp_dir, 'one.json')
+        with open(empty_input, 'w') as f:
+            json.dump([], f)
+        with open(one_example, 'w') as f:
+            json.dump(generate_examples(1, SCALES['small']), f)
+        output_file = os.path.join(tmp_dir, 'out', 'output.json')
+        for selection in selections:
+            empty = [run_cli(selection, empty_input, output_file, engine_argv) for _ in range(repeats)]
+            single = [run_cli(selection, one_example, output_file, engine_argv) for _ in range(repeats)]
+            results.append({'solvers': selection,
+                            'empty_input_s': round(statistics.median(empty), 3),
+                            'one_example_s': round(statistics.median(single), 3)})
+    return results
+
+
+def in_fresh_process(fn, *args):
+    """run `fn` in a newly spawned interpreter, so that peak RSS is measured per job"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(fn, *args).result()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scales', nargs='+', default=['small', 'medium'], choices=list(SCALES))
+    parser.add_argument('--solvers', nargs='+', default=SOLVER_KEYS, choices=SOLVER_KEYS)
+    parser.add_argument('--examples', type=int, default=20) # programs per scale and solver
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--skip_end_to_end', action='store_true')
+    parser.add_argument('--startup_repeats', type=int, default=3) # CLI runs per startup measurement, 0 to skip
+    parser.add_argument('--engine_args', type=str, default='') # extra logic_inference.py options, e.g. "--concurrent_solvers"
+    parser.add_argument('--output_file', type=str, default='benchmark_results.json')
+    args = parser.parse_args()
+
+    engine_argv = shlex.split(args.engine_args)
+    report = {'config': vars(args), 'startup': [], 'solvers': [], 'lp_backends': [], 'lp_trace_overhead': [],
+              'lp_goal_directed': [], 'lp_proof_size': [], 'fol_translate': [], 'end_to_end': []}
+    if args.startup_repeats > 0:
+        report['startup'] = measure_startup(args.solvers, args.startup_repeats, engine_argv)
+        for result in report['startup']:
+            print(f"startup {' '.join(result['solvers']):>15}: {result['empty_input_s']} s empty input, "
+                  f"{result['one_example_s']} s with one example")
+    for scale in args.scales:
+        for key in args.solvers:
+            params = SCALES[scale][key]
+            result = in_fresh_process(run_solver, key, params, args.examples, args.seed, engine_argv)
+            report['solvers'].append({'scale': scale, 'solver': key, 'params': params, **result})
+            print(f"{scale:>6} {key:>3}: {result['throughput_per_s']} programs/s, "
+                  f"p50 {result['latency_ms']['p50']} ms, p99 {result['latency_ms']['p99']} ms, "
+                  f"correct {result['correct']}/{result['examples']}")
+        if 'LP' in args.solvers:
+            result = in_fresh_process(run_lp_backends, SCALES[scale]['LP'], args.examples, args.seed)
+            report['lp_backends'].append({'scale': scale, **result})
+            print(f"{scale:>6} LP native: {result['native_ms']} ms vs Pyke {result['pyke_uncached_ms']} ms "
+                  f"compiling every program (x{result['speedup_vs_uncached']}), {result['pyke_cached_ms']} ms "
+                  f"with compiled rule bases (x{result['speedup_vs_cached']})"
+                  + ('' if result['answers_agree'] else ', ANSWERS DIFFER'))
+            result = in_fresh_process(run_trace_overhead, SCALES[scale]['LP'], args.examples, args.seed)
+            report['lp_trace_overhead'].append({'scale': scale, **result})
+            for backend, timing in result.items():
+                print(f"{scale:>6} LP trace ({backend}): {timing['traced_ms']} ms traced, "
+                      f"{timing['answer_only_ms']} ms answer-only, +{timing['overhead_pct']}%")
+            result = in_fresh_process(run_goal_directed, SCALES[scale]['LP'], args.examples, args.seed)
+            report['lp_goal_directed'].append({'scale': scale, **result})
+            print(f"{scale:>6} LP goal-directed: {result['goal_ms']} ms vs {result['native_ms']} ms, "
+                  f"{result['closure_skipped_pct']}% of the closure skipped, "
+                  f"{result['stopped_early']}/{args.examples} stopped early")
+            result = in_fresh_process(run_proof_size, SCALES[scale]['LP'], args.examples, args.seed)
+            report['lp_proof_size'].append({'scale': scale, **result})
+            print(f"{scale:>6} LP proof: {result['query_proof_chars']} chars for the query, "
+                  f"{result['closure_proof_chars']} for the closure vs {result['trace_chars']} traced "
+                  f"(-{result['query_reduction_pct']}% / -{result['closure_reduction_pct']}%)")
+        if 'FOL' in args.solvers:
+            result = in_fresh_process(run_fol_translate, SCALES[scale]['FOL'], args.examples, args.seed)
+            report['fol_translate'].append({'scale': scale, **result})
+            print(f"{scale:>6} FOL per formula: {result['fol_parse_ms']} ms parse, {result['translate_ms']} ms "
+                  f"translation ({result['first_program_ms']} ms for the first program)")
+        if not args.skip_end_to_end:
+            result = in_fresh_process(run_end_to_end, SCALES[scale], args.examples, args.seed, engine_argv)
+            report['end_to_end'].append({'scale': scale, **result})
+            print(f"{scale:>6} all: {result['throughput_per_s']} examples/s, "
+                  f"p50 {result['latency_ms']['p50']} ms, p99 {result['latency_ms']['p99']} ms")
+
+    # same clean up as a regular inference run
+    LogicInferenceEngine(parse_args(engine_argv), load_dataset=False).cleanup()
+
+    output_dir = os.path.dirname(args.output_file)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(args.output_file, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved benchmark results to {args.output_file}")
+
+
+if __name__ == '__main__':
+    main()
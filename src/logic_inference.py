@@ -1,76 +1,273 @@
 import argparse
+import asyncio
+import glob
+import importlib
 import json
 import os
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-from symbolic_solvers.pyke_solver.pyke_solver import Pyke_Program
-from symbolic_solvers.fol_solver.prover9_solver import FOL_Prover9_Program
-from symbolic_solvers.csp_solver.csp_solver import CSP_Program
-from symbolic_solvers.z3_solver.sat_problem_solver import LSAT_Z3_Program
 from backup_answer_generation import Backup_Answer_Generator
+from result_cache import SolverResultCache, solver_version
+from result_io import JSONLResultWriter, compact_jsonl, is_jsonl, load_examples, read_results
 
 
 
 # currently 4 SLs are from different datasets for MVP, the mapping will be adjusted in the future
+# (module, class, dataset name), a backend (pyke, nltk + prover9, python-constraint, z3) is only
+# imported once one of its programs has to be executed, see load_program_class
 PROGRAM_CLASS = {
-    'LP': (Pyke_Program, 'ProntoQA'),
-    'FOL': (FOL_Prover9_Program, 'FOLIO'),
-    'CSP': (CSP_Program, 'LogicalDeduction'),
-    'SAT': (LSAT_Z3_Program, 'AR-LSAT'),
+    'LP': ('symbolic_solvers.pyke_solver.pyke_solver', 'Pyke_Program', 'ProntoQA'),
+    'FOL': ('symbolic_solvers.fol_solver.prover9_solver', 'FOL_Prover9_Program', 'FOLIO'),
+    'CSP': ('symbolic_solvers.csp_solver.csp_solver', 'CSP_Program', 'LogicalDeduction'),
+    'SAT': ('symbolic_solvers.z3_solver.sat_problem_solver', 'LSAT_Z3_Program', 'AR-LSAT'),
 }
 
+SOLVER_KEYS = ['LP', 'FOL', 'CSP', 'SAT']
+
+# a solver key with one of these statuses is done and is not re-run by --resume
+FINAL_STATUSES = ('success', 'parsing error', 'execution error')
+
+# only deterministic outcomes are cached, an execution error may be a timeout that passes on a rerun
+CACHEABLE_STATUSES = ('success', 'parsing error')
+
+# with --deadline, solvers run one after the other split what is left of an example's deadline in these
+# proportions (roughly those of their own per-stage limits), concurrent solvers each get all of it
+BUDGET_WEIGHTS = {'LP': 1, 'FOL': 4, 'CSP': 2, 'SAT': 1}
+BUDGET_EXHAUSTED = 'time budget exhausted'
+
+# solvers that write their programs to a cache directory and accept a `cache_tag` for a private copy
+CACHED_SOLVERS = ['LP', 'SAT']
+
+
+def load_program_class(key):
+    """
+    the program class of solver `key`, importing its backend on first use
+    """
+    module_name, class_name, _ = PROGRAM_CLASS[key]
+    return getattr(importlib.import_module(module_name), class_name)
+
 
 class LogicInferenceEngine:
-    def __init__(self, args):
+    def __init__(self, args, load_dataset=True):
         self.args = args
-        self.dataset = self.load_logic_programs(args.input_file)
+        self.dataset = self.load_logic_programs(args.input_file) if load_dataset else []
         self.output_file = args.output_file
+        self.workers = getattr(args, 'workers', 1)
+        self.flush_every = getattr(args, 'flush_every', 10)
+        self.deadline = getattr(args, 'deadline', 0) or None  # seconds per example, None for no limit
+        # solver keys to run, the backends of the others are never imported
+        self.solver_keys = [key for key in SOLVER_KEYS if key in (getattr(args, 'solvers', None) or SOLVER_KEYS)]
+
+        # {example id: result record} already in the output file, only filled with --resume
+        self.resume = getattr(args, 'resume', False)
+        self.completed = self.load_completed(self.output_file) if self.resume and load_dataset else {}
+
+        # extra constructor kwargs per solver key, e.g. private cache directories in worker processes
+        self.program_kwargs = {key: {} for key in PROGRAM_CLASS}
+        self.program_kwargs['LP']['backend'] = getattr(args, 'lp_backend', 'native')
+        self.program_kwargs['LP']['proof'] = getattr(args, 'lp_proof', None)
+
+        # optional, persistent solver result cache shared across runs and worker processes
+        cache_path = getattr(args, 'cache_path', '')
+        self.result_cache = None
+        if cache_path:
+            cache_dir = os.path.dirname(cache_path)
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+            self.result_cache = SolverResultCache(cache_path, max_bytes=int(args.cache_max_mb * 1024 * 1024))
+        self.solver_versions = {key: solver_version(PROGRAM_CLASS[key][0]) for key in self.solver_keys}
+        if 'LP' in self.solver_versions:
+            # cached LP results hold the reasoning of the backend and the kind they were run with, the
+            # backends trace in different orders
+            self.solver_versions['LP'] += f"-backend-{self.program_kwargs['LP']['backend']}"
+            if self.program_kwargs['LP']['proof']:
+                self.solver_versions['LP'] += f"-proof-{self.program_kwargs['LP']['proof']}"
+
+        # optional, run the solvers of one example concurrently under an event loop
+        self.concurrent_solvers = getattr(args, 'concurrent_solvers', False)
+        if self.concurrent_solvers:
+            self.event_loop = asyncio.new_event_loop()
+            # in-process solvers (Pyke, python-constraint) are CPU bound and run in these threads
+            self.solver_threads = ThreadPoolExecutor(max_workers=2)
 
         # optional, use LLMwCOT & random guess as backup answers in case solver fails
         self.backup_strategy = args.backup_strategy
         self.backup_LLM_result_path = args.backup_LLM_result_path
         self.backup_generators = {
-            key: Backup_Answer_Generator(name, self.backup_strategy, self.backup_LLM_result_path)
-            for key, (_, name) in PROGRAM_CLASS.items()
+            key: Backup_Answer_Generator(PROGRAM_CLASS[key][2], self.backup_strategy, self.backup_LLM_result_path)
+            for key in self.solver_keys
         }
 
     def load_logic_programs(self, input_file):
-        with open(input_file, 'r') as f:
-            dataset = json.load(f)
-        print(f"Loaded {len(dataset)} examples from {input_file}")
+        # .jsonl inputs are streamed through a generator instead of being loaded at once
+        dataset = load_examples(input_file)
+        if is_jsonl(input_file):
+            print(f"Streaming examples from {input_file}")
+        else:
+            print(f"Loaded {len(dataset)} examples from {input_file}")
         return dataset
 
+    def load_completed(self, output_file):
+        """
+        collect the records of a previous run, cutting a partially written last line off the output
+        """
+        completed = {}
+        for record in read_results(output_file, repair=True):
+            # a later record for the same id supersedes the earlier one
+            completed[record.get('id')] = record
+        n_done = sum(1 for record in completed.values() if not self.missing_keys(record))
+        print(f"Resuming from {output_file}: {n_done} complete, {len(completed) - n_done} partial examples")
+        return completed
+
+    def missing_keys(self, record):
+        """
+        selected solver keys of a result record that have not reached a final status yet
+        """
+        if record is None:
+            return list(self.solver_keys)
+        return [key for key in self.solver_keys if record.get(f'{key}_status_code') not in FINAL_STATUSES]
+
     def save_results(self, outputs):
         os.makedirs(os.path.dirname(self.output_file), exist_ok=True)
         with open(self.output_file, 'w') as f:
             json.dump(outputs, f, indent=2, ensure_ascii=False)
 
-    def safe_execute_program(self, key, logic_program, example_id):
+    def safe_execute_program(self, key, logic_program, example_id, timeout=None):
         """
+        timeout: optional time budget in seconds for parsing and solving
         returns:
             answer: the answer to the question
             status_code: 'success' or 'execution error' or 'parsing error'
             error_message: the error message if status_code is 'execution error' or 'parsing error'
             reasoning: the reasoning if status_code is 'success'
+            timings: {stage: seconds} reported by the solver, plus the cache lookup when a cache is used
         """
-        cls, dataset_name = PROGRAM_CLASS[key]
-        program = cls(logic_program, dataset_name)
+        start = time.perf_counter()
+        cache_key, outcome = self.lookup_cache(key, logic_program)
+        timings = {} if cache_key is None else {'cache_lookup': time.perf_counter() - start}
+        if outcome is None:
+            outcome, solver_timings = self.execute_program(key, logic_program, timeout)
+            timings.update(solver_timings)
+            self.store_cache(cache_key, outcome)
+        return (*self.with_backup_answer(key, example_id, outcome), timings)
 
-        if not getattr(program, 'flag', True): # flag 表示是否成功parse逻辑程序SL, 不代表execute成功与否
-            answer = self.backup_generators[key].get_backup_answer(example_id)
-            return answer, 'parsing error', '', ''
+    async def async_safe_execute_program(self, key, logic_program, example_id, timeout=None):
+        """
+        asyncio counterpart of safe_execute_program
+        """
+        start = time.perf_counter()
+        cache_key, outcome = self.lookup_cache(key, logic_program)
+        timings = {} if cache_key is None else {'cache_lookup': time.perf_counter() - start}
+        if outcome is None:
+            outcome, solver_timings = await self.async_execute_program(key, logic_program, timeout)
+            timings.update(solver_timings)
+            self.store_cache(cache_key, outcome)
+        return (*self.with_backup_answer(key, example_id, outcome), timings)
 
-        answer, err, reasoning = program.execute_program()
-        if answer is None:
+    def lookup_cache(self, key, logic_program):
+        """
+        returns the cache key (None without a cache) and the cached outcome (None on a miss)
+        """
+        if self.result_cache is None:
+            return None, None
+        dataset_name = PROGRAM_CLASS[key][2]
+        cache_key = self.result_cache.make_key(key, dataset_name, logic_program, self.solver_versions[key])
+        return cache_key, self.result_cache.get(cache_key)
+
+    def store_cache(self, cache_key, outcome):
+        if cache_key is not None and outcome[1] in CACHEABLE_STATUSES:
+            self.result_cache.put(cache_key, *outcome)
+
+    def with_backup_answer(self, key, example_id, outcome):
+        answer, status_code, err, reasoning = outcome
+        if status_code != 'success':
             answer = self.backup_generators[key].get_backup_answer(example_id)
-            return answer, 'execution error', err, ''
+        return answer, status_code, err, reasoning
+
+    def build_program(self, key, logic_program, timeout=None):
+        cls, dataset_name = load_program_class(key), PROGRAM_CLASS[key][2]
+        return cls(logic_program, dataset_name, timeout=timeout, **self.program_kwargs[key])
 
+    @staticmethod
+    def parse_failure(program):
+        """
+        the outcome of a program that could not be parsed, None if parsing succeeded
+        """
+        if getattr(program, 'flag', True): # flag 表示是否成功parse逻辑程序SL, 不代表execute成功与否
+            return None
+        if getattr(program, 'budget_exhausted', False):
+            return None, 'execution error', BUDGET_EXHAUSTED, ''
+        return None, 'parsing error', getattr(program, 'parse_error', ''), ''
+
+    @staticmethod
+    def map_answer(program, answer, err, reasoning):
+        if answer is None:
+            return None, 'execution error', str(err), ''
         # answer 为各solver原始输出, 需要通过answer_mapping映射为option
         mapped = program.answer_mapping(answer)
         return mapped, 'success', '', reasoning
 
-    def inference_on_dataset(self):
-        outputs = []
-        for example in self.dataset:
+    def execute_program(self, key, logic_program, timeout=None):
+        """
+        parse and solve one program
+        returns: the first four returns of safe_execute_program (answer is None on failure) and the
+            solver's {stage: seconds}
+        """
+        if timeout is not None and timeout <= 0:
+            return (None, 'execution error', BUDGET_EXHAUSTED, ''), {}
+        program = self.build_program(key, logic_program, timeout)
+        failure = self.parse_failure(program)
+        if failure is not None:
+            return failure, program.timings
+        return self.map_answer(program, *program.execute_program()), program.timings
+
+    async def async_execute_program(self, key, logic_program, timeout=None):
+        """
+        asyncio counterpart of execute_program, solvers that launch subprocesses (Prover9, Z3) provide
+        `async_execute_program`, the in-process ones are moved to a thread
+        """
+        if timeout is not None and timeout <= 0:
+            return (None, 'execution error', BUDGET_EXHAUSTED, ''), {}
+        # parsing is cheap next to solving and stays on the event loop thread
+        program = self.build_program(key, logic_program, timeout)
+        failure = self.parse_failure(program)
+        if failure is not None:
+            return failure, program.timings
+        if hasattr(program, 'async_execute_program'):
+            outputs = await program.async_execute_program()
+        else:
+            outputs = await asyncio.get_running_loop().run_in_executor(self.solver_threads, program.execute_program)
+        return self.map_answer(program, *outputs), program.timings
+
+    async def async_run_solvers(self, example, keys, deadline):
+        async def run(key):
+            start = time.monotonic()
+            timeout = self.solver_budget(key, keys, deadline)
+            outcome = await self.async_safe_execute_program(key, example[key][0], example['id'], timeout)
+            return (*outcome, time.monotonic() - start)
+        return await asyncio.gather(*[run(key) for key in keys])
+
+    def solver_budget(self, key, pending_keys, deadline):
+        """
+        time budget of solver `key` given the example deadline, `pending_keys` are the solvers still to run
+        """
+        if deadline is None:
+            return None
+        left = deadline - time.monotonic()
+        if self.concurrent_solvers:
+            return left
+        return left * BUDGET_WEIGHTS[key] / sum(BUDGET_WEIGHTS[k] for k in pending_keys)
+
+    def process_example(self, example, previous=None):
+        """
+        run all solvers on one example and return its result record
+        with `previous` (its record from an earlier run), only the solvers still missing are run
+        """
+        if previous is not None:
+            result = dict(previous)
+        else:
             result = {
                 'id': example.get('id'),
                 'context': example.get('context'),
@@ -78,21 +275,118 @@ class LogicInferenceEngine:
                 'option': example.get('options'),
                 'answer': example.get('answer'),
             }
-            for key in ['LP', 'FOL', 'CSP', 'SAT']:
-                logic_str = example[key][0]
-                predicted, status_code, err, reasoning = self.safe_execute_program(key, logic_str, example['id'])
-                result[f'{key}_status_code'] = status_code
-                result[f'{key}_error_message'] = err
-                result[f'{key}_predicted_answer'] = predicted
-                result[f'{key}_reasoning'] = reasoning
-            outputs.append(result)
-
-        self.save_results(outputs)
+        keys = self.missing_keys(previous)
+        deadline = time.monotonic() + self.deadline if self.deadline else None
+        if self.concurrent_solvers:
+            outcomes = self.event_loop.run_until_complete(self.async_run_solvers(example, keys, deadline))
+        else:
+            outcomes = []
+            for i, key in enumerate(keys):
+                # time left over by one solver rolls over to the ones after it
+                start = time.monotonic()
+                timeout = self.solver_budget(key, keys[i:], deadline)
+                outcome = self.safe_execute_program(key, example[key][0], example['id'], timeout)
+                outcomes.append((*outcome, time.monotonic() - start))
+        for key, (predicted, status_code, err, reasoning, timings, time_used) in zip(keys, outcomes):
+            result[f'{key}_status_code'] = status_code
+            result[f'{key}_error_message'] = err
+            result[f'{key}_predicted_answer'] = predicted
+            result[f'{key}_reasoning'] = reasoning
+            result[f'{key}_time_used'] = round(time_used, 3)  # wall-clock seconds
+            result[f'{key}_timings'] = {stage: round(seconds, 4) for stage, seconds in timings.items()}
+        return result
+
+    def iter_tasks(self, skip_completed):
+        """
+        pair each example with its record from a previous run (None if there is none)
+        """
+        for example in self.dataset:
+            previous = self.completed.get(example.get('id'))
+            if skip_completed and previous is not None and not self.missing_keys(previous):
+                continue
+            yield example, previous
+
+    def iter_results(self, tasks):
+        """
+        yield result records in input order, solving up to `workers` examples in parallel
+        """
+        if self.workers <= 1:
+            for example, previous in tasks:
+                yield self.process_example(example, previous)
+            return
+
+        # keep a bounded window of pending examples instead of executor.map, which would
+        # consume a streamed input in full before yielding the first result
+        with ProcessPoolExecutor(max_workers=self.workers,
+                                 initializer=_init_worker, initargs=(self.args,)) as executor:
+            pending = deque()
+            for example, previous in tasks:
+                pending.append(executor.submit(_process_example, example, previous))
+                if len(pending) >= 2 * self.workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def tally_timings(self, results, totals):
+        """
+        pass result records through, summing their per-stage timings into totals[key][stage] = [seconds, count]
+        """
+        for result in results:
+            for key in SOLVER_KEYS:
+                for stage, seconds in (result.get(f'{key}_timings') or {}).items():
+                    totals[key][stage][0] += seconds
+                    totals[key][stage][1] += 1
+            yield result
+
+    @staticmethod
+    def print_timing_summary(totals):
+        print('Solver stage timings (total / mean per program):')
+        for key in SOLVER_KEYS:
+            if not totals[key]:
+                continue
+            stages = sorted(totals[key].items(), key=lambda item: -item[1][0])
+            print(f'  {key}: ' + ', '.join(f'{stage} {total:.2f}s / {total / count * 1000:.1f}ms'
+                                          for stage, (total, count) in stages))
+        # LP programs that went to Pyke either reused a compiled rule base or compiled one
+        compiled = totals['LP'].get('krb_compile', [0.0, 0])
+        reused = totals['LP'].get('krb_cache_hit', [0.0, 0])
+        if compiled[1] + reused[1]:
+            print(f'  Pyke rule bases: {reused[1]}/{compiled[1] + reused[1]} reused '
+                  f'({reused[1] / (compiled[1] + reused[1]):.0%} hit rate), {compiled[0]:.2f}s compiling')
+
+    def inference_on_dataset(self):
+        cache_stats_before = self.result_cache.stats() if self.result_cache is not None else None
+        timing_totals = defaultdict(lambda: defaultdict(lambda: [0.0, 0]))
+        if is_jsonl(self.output_file):
+            # records of a resumed run are already in the file, only the remaining work is appended
+            results = self.tally_timings(self.iter_results(self.iter_tasks(skip_completed=True)), timing_totals)
+            # each record is appended as soon as it is done, flushed every `flush_every` records
+            with JSONLResultWriter(self.output_file, self.flush_every, append=self.resume) as writer:
+                for result in results:
+                    writer.write(result)
+            if self.resume:
+                # a partially completed example got a second, full record: keep one record per example
+                dropped = compact_jsonl(self.output_file)
+                if dropped:
+                    print(f"Compacted {self.output_file}: dropped {dropped} superseded records")
+        else:
+            results = self.tally_timings(self.iter_results(self.iter_tasks(skip_completed=False)), timing_totals)
+            self.save_results(list(results))
         self.cleanup()
+        self.print_timing_summary(timing_totals)
+
+        if cache_stats_before is not None:
+            # counters live in the cache file, so this also covers lookups made by worker processes
+            stats = self.result_cache.stats()
+            hits = stats['hits'] - cache_stats_before['hits']
+            misses = stats['misses'] - cache_stats_before['misses']
+            print(f"Result cache: {hits} hits, {misses} misses, "
+                  f"{stats['evictions'] - cache_stats_before['evictions']} evictions, "
+                  f"{stats['entries']} entries ({stats['bytes'] / 1024 / 1024:.1f} MB)")
 
     def cleanup(self):
         """
-        remove the compiled krb directory
+        remove the compiled krb directory, together with the private caches of worker processes
         """
         cache_program_dir = 'src/symbolic_solvers/pyke_solver/.cache_program'
         compiled_dir = 'src/compiled_krb'
@@ -103,13 +397,49 @@ class LogicInferenceEngine:
             print('removing compiled_krb')
             os.system(f'rm -rf {compiled_dir}')
 
-def parse_args():
+        # also compiled packages a crashed run left behind, Pyke_Program removes its own once loaded
+        worker_dirs = glob.glob('src/symbolic_solvers/*_solver/.cache_program_w*') + glob.glob('src/compiled_krb_*')
+        if worker_dirs:
+            print(f'removing {len(worker_dirs)} worker cache directories')
+            for worker_dir in worker_dirs:
+                os.system(f'rm -rf {worker_dir}')
+
+
+# ----------------------------------------------------------------------
+# process pool helpers, each worker process keeps one engine with its own solver caches
+
+_worker_engine = None
+
+
+def _init_worker(args):
+    global _worker_engine
+    _worker_engine = LogicInferenceEngine(args, load_dataset=False)
+    cache_tag = f'w{os.getpid()}'
+    for key in CACHED_SOLVERS:
+        _worker_engine.program_kwargs[key]['cache_tag'] = cache_tag
+
+
+def _process_example(example, previous=None):
+    return _worker_engine.process_example(example, previous)
+
+
+def parse_args(argv=None):
     parser = argparse.ArgumentParser()
     parser.add_argument('--input_file', type=str, default=os.path.join('sample_data', 'sample_input.json'))
     parser.add_argument('--output_file', type=str, default=os.path.join('sample_data', 'sample_output.json'))
     parser.add_argument('--backup_strategy', type=str, default='random', choices=['random', 'LLM'])
     parser.add_argument('--backup_LLM_result_path', type=str, default='') # path to the LLMwCOT result
-    return parser.parse_args()
+    parser.add_argument('--solvers', nargs='+', default=SOLVER_KEYS, choices=SOLVER_KEYS) # solver keys to run
+    parser.add_argument('--lp_backend', type=str, default='native', choices=['native', 'bitset', 'goal', 'pyke']) # in-process LP engine, its bitset fast path for unary theories or goal-directed mode, or Pyke compilation
+    parser.add_argument('--lp_proof', type=str, default=None, choices=['query', 'closure']) # LP reasoning as the proof of the query facts or of all implied facts instead of the full trace
+    parser.add_argument('--workers', type=int, default=1) # number of worker processes, 1 runs serially
+    parser.add_argument('--resume', action='store_true') # skip work already completed in output_file, .jsonl output is compacted to one record per example at the end
+    parser.add_argument('--deadline', type=float, default=0) # wall-clock seconds per example split across solvers, 0 for no limit
+    parser.add_argument('--concurrent_solvers', action='store_true') # run the 4 solvers of an example concurrently
+    parser.add_argument('--cache_path', type=str, default='') # SQLite solver result cache, disabled if empty
+    parser.add_argument('--cache_max_mb', type=float, default=512) # evict least recently used results beyond this
+    parser.add_argument('--flush_every', type=int, default=10) # records per flush when writing .jsonl output
+    return parser.parse_args(argv)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,112 @@
+"""
+persistent, content-addressed cache of solver results
+
+entries are keyed by a hash of (solver key, dataset name, normalized program text, solver version), so
+the same program produced by different prompts / reruns is solved once; the cache lives in a single
+SQLite file that can be shared by all worker processes and is trimmed by least-recent use once the
+stored payload exceeds `max_bytes`
+"""
+import hashlib
+import importlib.util
+import json
+import os
+import sqlite3
+import time
+
+
+def normalize_program(logic_program):
+    """ignore line endings and trailing whitespace, which do not change what a solver sees"""
+    lines = logic_program.replace('\r\n', '\n').strip().split('\n')
+    return '\n'.join(line.rstrip() for line in lines)
+
+
+def solver_version(module_name):
+    """
+    fingerprint of the package implementing a solver (every python file next to its module), so that
+    editing a solver or one of its helpers invalidates its entries; the module is located without importing it
+    """
+    solver_dir = os.path.dirname(importlib.util.find_spec(module_name).origin)
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(solver_dir)):
+        if name.endswith('.py'):
+            with open(os.path.join(solver_dir, name), 'rb') as f:
+                digest.update(name.encode('utf-8') + b'\0' + f.read())
+    return digest.hexdigest()[:16]
+
+
+class SolverResultCache:
+    def __init__(self, path, max_bytes=512 * 1024 * 1024):
+        """
+        Args:
+            path (str): SQLite file, created if it does not exist
+            max_bytes (int): upper bound on the stored payload, least recently used entries are evicted beyond it
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            'key TEXT PRIMARY KEY, payload TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)')
+        # lifetime counters, shared by every process that uses the same file
+        self.conn.execute('CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+        self.conn.execute("INSERT OR IGNORE INTO stats VALUES ('hits', 0), ('misses', 0), ('evictions', 0)")
+
+    @staticmethod
+    def make_key(key, dataset_name, logic_program, version):
+        content = '\0'.join([key, dataset_name, normalize_program(logic_program), version])
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def get(self, cache_key):
+        """
+        returns (answer, status_code, error_message, reasoning), None on a miss
+        """
+        row = self.conn.execute('SELECT payload FROM results WHERE key = ?', (cache_key,)).fetchone()
+        if row is None:
+            self._bump('misses')
+            return None
+        self.conn.execute('UPDATE results SET last_used = ? WHERE key = ?', (time.time(), cache_key))
+        self._bump('hits')
+        return tuple(json.loads(row[0]))
+
+    def put(self, cache_key, answer, status_code, error_message, reasoning):
+        payload = json.dumps([answer, status_code, error_message, reasoning], ensure_ascii=False)
+        size = len(payload.encode('utf-8'))
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            self.conn.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)',
+                              (cache_key, payload, size, time.time()))
+            self._evict()
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+
+    def _evict(self):
+        total = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = []
+        cursor = self.conn.execute('SELECT key, size FROM results ORDER BY last_used ASC')
+        for cache_key, size in cursor:
+            if total <= self.max_bytes:
+                break
+            evicted.append((cache_key,))
+            total -= size
+        cursor.close()
+        self.conn.executemany('DELETE FROM results WHERE key = ?', evicted)
+        self._bump('evictions', len(evicted))
+
+    def _bump(self, name, n=1):
+        self.conn.execute('UPDATE stats SET value = value + ? WHERE name = ?', (n, name))
+
+    def stats(self):
+        counters = dict(self.conn.execute('SELECT name, value FROM stats'))
+        counters['entries'], counters['bytes'] = self.conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results').fetchone()
+        return counters
+
+    def close(self):
+        self.conn.close()
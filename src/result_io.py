@@ -0,0 +1,140 @@
+"""
+reading logic programs and writing result records
+
+`.json` files hold a single JSON array (the format of `sample_data/`), `.jsonl` files hold one record
+per line and are read lazily / written incrementally, so long runs keep memory flat and lose at most
+one unflushed batch on a crash
+"""
+import json
+import os
+
+
+def is_jsonl(path):
+    return path.endswith('.jsonl')
+
+
+def iter_jsonl(path):
+    """lazily yield one record per non-empty line"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def load_examples(path):
+    """
+    returns a list for JSON arrays and a generator for JSON lines
+    """
+    if is_jsonl(path):
+        return iter_jsonl(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def read_results(path, repair=False):
+    """
+    read the records already written to `path`, an empty list if there is none yet
+
+    a `.jsonl` line without its trailing newline (or that does not parse) is treated as a partially
+    written tail and dropped together with everything after it; with `repair` it is also cut from the
+    file, so that new records can be appended cleanly
+    """
+    if not os.path.exists(path):
+        return []
+    if not is_jsonl(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            try:
+                return json.load(f)
+            except json.JSONDecodeError:
+                return []
+
+    records = []
+    valid_end = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            stripped = line.strip()
+            if stripped:
+                try:
+                    records.append(json.loads(stripped))
+                except json.JSONDecodeError:
+                    break
+            valid_end += len(line)
+
+    if repair and valid_end < os.path.getsize(path):
+        print(f"Dropping partially written tail of {path}")
+        with open(path, 'r+b') as f:
+            f.truncate(valid_end)
+    return records
+
+
+def compact_jsonl(path):
+    """
+    rewrite a `.jsonl` result file with one record per id: the last one written for it, at the place of
+    the first one, i.e. in input order when later records only redo examples (as --resume appends them);
+    only ids and line offsets are held in memory, the file is replaced at once
+
+    Returns:
+        int: the number of records dropped
+    """
+    order = []  # the id of each record to keep, in file order of their first records
+    last = {}  # id -> offset of its last record
+    offset = n_records = 0
+    with open(path, 'rb') as f:
+        for idx, line in enumerate(f):
+            if line.strip():
+                n_records += 1
+                key = json.loads(line).get('id')
+                if key is None:
+                    key = ('line', idx)  # records without an id are all kept
+                if key not in last:
+                    order.append(key)
+                last[key] = offset
+            offset += len(line)
+    if n_records == len(order):
+        return 0
+    tmp_path = path + '.tmp'
+    with open(path, 'rb') as src, open(tmp_path, 'wb') as dst:
+        for key in order:
+            src.seek(last[key])
+            dst.write(src.readline())
+    os.replace(tmp_path, path)
+    return n_records - len(order)
+
+
+class JSONLResultWriter:
+    """
+    appends result records to a `.jsonl` file, flushing to disk every `flush_every` records
+    """
+    def __init__(self, path, flush_every=10, append=False):
+        output_dir = os.path.dirname(path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        self.path = path
+        self.flush_every = max(1, flush_every)
+        self.buffer = []
+        self.file = open(path, 'a' if append else 'w', encoding='utf-8')
+
+    def write(self, record):
+        self.buffer.append(json.dumps(record, ensure_ascii=False))
+        if len(self.buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.file.write('\n'.join(self.buffer) + '\n')
+            self.buffer = []
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,158 @@
+"""
+stand-in client for solver_service.py, sends the examples of an input file and reports latencies
+
+the overhead of a request is its round-trip latency minus the solve time the service reports for it
+(`time_used`, the wall-clock time the worker spent on the example), i.e. what the service adds on top of
+the raw solving
+
+    # against a running HTTP service
+    python src/service_client.py --input_file sample_data/sample_input.json --url http://127.0.0.1:8765
+    # start a stdin / stdout service as a subprocess, extra service options go after --
+    python src/service_client.py --input_file sample_data/sample_input.json -- --workers 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmark import percentile
+from result_io import load_examples
+from solver_service import READY_MESSAGE
+
+
+def solver_time(record):
+    return record.get('time_used') or 0
+
+
+def post(url, request):
+    data = json.dumps(request).encode('utf-8')
+    http_request = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(http_request) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return json.loads(e.read())
+
+
+def run_http(url, examples, concurrency):
+    """returns [(response, latency)] in input order"""
+    def send(example):
+        start = time.perf_counter()
+        response = post(url, example)
+        return response, time.perf_counter() - start
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(send, examples))
+
+
+def start_service(service_argv):
+    """
+    start a stdin / stdout service as a subprocess and wait until its workers are warm (its stderr is passed
+    on), so that requests are not timed while it starts up
+    """
+    service = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'solver_service.py')
+    proc = subprocess.Popen([sys.executable, service] + service_argv, stdin=subprocess.PIPE,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    ready = threading.Event()
+
+    def forward_stderr():
+        for line in proc.stderr:
+            sys.stderr.write(line)
+            if line.startswith(READY_MESSAGE):
+                ready.set()
+        ready.set()  # the service exited before it was ready
+
+    threading.Thread(target=forward_stderr, daemon=True).start()
+    ready.wait()
+    if proc.poll() is not None:
+        raise RuntimeError(f'solver service exited with code {proc.returncode} before it was ready')
+    return proc
+
+
+def run_stdio(proc, examples, concurrency):
+    """
+    keep up to `concurrency` requests in flight to a service started by start_service,
+    returns [(response, latency)] in input order; latency is None for a request whose response carried no
+    id the client sent (e.g. `id: null` when the service could not read it), such responses are paired
+    with the requests left without one
+    """
+    sent, results, unmatched = {}, {}, []
+    slots = threading.Semaphore(concurrency)
+
+    def read_responses():
+        for line in proc.stdout:
+            response = json.loads(line)
+            request_id = response.get('id')
+            if request_id in sent and request_id not in results:
+                results[request_id] = (response, time.perf_counter() - sent[request_id])
+            else:
+                unmatched.append((response, None))
+            slots.release()
+
+    reader = threading.Thread(target=read_responses)
+    reader.start()
+    for example in examples:
+        slots.acquire()
+        sent[example['id']] = time.perf_counter()
+        proc.stdin.write(json.dumps(example, ensure_ascii=False) + '\n')
+        proc.stdin.flush()
+    proc.stdin.close()
+    reader.join()
+    proc.wait()
+    responses = []
+    for example in examples:
+        if example['id'] not in results:
+            results[example['id']] = unmatched.pop(0) if unmatched else (
+                {'id': example['id'], 'error': 'no response from the service'}, None)
+        responses.append(results[example['id']])
+    return responses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--input_file', type=str, default=os.path.join('sample_data', 'sample_input.json'))
+    parser.add_argument('--url', type=str, default='') # HTTP service, empty to start a stdin / stdout one
+    parser.add_argument('--concurrency', type=int, default=4) # requests in flight
+    parser.add_argument('--repeat', type=int, default=1) # send the input examples this many times
+    parser.add_argument('--output_file', type=str, default='') # optionally save the responses as JSON lines
+    args, service_argv = parser.parse_known_args()
+    if service_argv[:1] == ['--']:
+        service_argv = service_argv[1:]
+
+    examples = list(load_examples(args.input_file))
+    # ids have to be unique for the stdin / stdout protocol, which answers out of order
+    examples = [dict(example, id=f"{example['id']}#{i}") if args.repeat > 1 else example
+                for i in range(args.repeat) for example in examples]
+
+    proc = None if args.url else start_service(service_argv)
+    start = time.perf_counter()
+    if args.url:
+        responses = run_http(args.url, examples, args.concurrency)
+    else:
+        responses = run_stdio(proc, examples, args.concurrency)
+    total = time.perf_counter() - start
+
+    errors = [response for response, _ in responses if 'error' in response]
+    latencies = [latency for _, latency in responses if latency is not None]
+    overheads = [latency - solver_time(response) for response, latency in responses
+                 if latency is not None and 'error' not in response]
+    print(f"{len(responses)} requests in {total:.2f}s ({len(responses) / total:.2f}/s), {len(errors)} errors")
+    if latencies:
+        print(f"latency  p50 {percentile(latencies, 50) * 1000:.1f} ms, p95 {percentile(latencies, 95) * 1000:.1f} ms")
+    if overheads:
+        print(f"overhead p50 {percentile(overheads, 50) * 1000:.1f} ms, "
+              f"p95 {percentile(overheads, 95) * 1000:.1f} ms (latency minus reported solve time)")
+
+    if args.output_file:
+        with open(args.output_file, 'w') as f:
+            for response, _ in responses:
+                f.write(json.dumps(response, ensure_ascii=False) + '\n')
+
+
+if __name__ == '__main__':
+    main()
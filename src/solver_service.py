@@ -0,0 +1,232 @@
+"""
+long-running solver service, keeps warm LogicInferenceEngine worker processes between requests
+
+a request is one example in the input format of logic_inference.py (id and one program per solver key),
+the response is its result record plus `time_used`, the wall-clock seconds the worker spent on it; requests are solved concurrently by `--workers` processes which keep
+nltk, pyke, z3, ply and python-constraint imported and are warmed up on a synthetic example at start
+
+    # JSON lines over stdin / stdout, responses are written as they complete (match them by id)
+    python src/solver_service.py --workers 4 < requests.jsonl
+    # HTTP: POST / with one request as the body, GET /health
+    python src/solver_service.py --workers 4 --port 8765
+
+every other option is passed on to logic_inference.py, e.g. --solvers, --deadline, --concurrent_solvers, --cache_path
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import logic_inference
+from logic_inference import SOLVER_KEYS, LogicInferenceEngine, _init_worker, _process_example
+from synthetic_workload import generate_examples
+
+
+# start of the line written to stderr once the workers are warm, clients wait for it before timing requests
+READY_MESSAGE = 'Solver service ready'
+# seconds the workers get to start and warm up
+WARMUP_TIMEOUT = 300
+
+_warm_barrier = None
+
+
+def _init_service_worker(args, warmup, warm_barrier):
+    global _warm_barrier
+    _init_worker(args)
+    if warmup:
+        # first calls pay for lazy imports, prover9 / parser set up and pyke's compiler modules
+        # (this also imports the backends of the selected solvers)
+        logic_inference._worker_engine.process_example(generate_examples(1, seed=0)[0])
+    _warm_barrier = warm_barrier
+
+
+def _wait_warm():
+    # each call holds its worker until all of them got here, so `workers` calls run on distinct, warm workers
+    _warm_barrier.wait(WARMUP_TIMEOUT)
+
+
+def _solve(example):
+    start = time.perf_counter()
+    result = _process_example(example)
+    # the solvers of an example may overlap (--concurrent_solvers), their {key}_time_used do not add up to this
+    result['time_used'] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def normalize_request(request, solver_keys):
+    """
+    check a request and accept a bare program string in place of the one-element list of the input format
+    """
+    if not isinstance(request, dict):
+        raise ValueError('a request must be a JSON object')
+    missing = [key for key in solver_keys if key not in request]
+    if missing:
+        raise ValueError(f"missing programs for {', '.join(missing)}")
+    example = dict(request)
+    for key in solver_keys:
+        if isinstance(example[key], str):
+            example[key] = [example[key]]
+    return example
+
+
+class SolverService:
+    def __init__(self, args, warmup=True):
+        self.args = args
+        self.workers = max(1, args.workers)
+        self.solver_keys = [key for key in SOLVER_KEYS if key in args.solvers]
+        warm_barrier = multiprocessing.Barrier(self.workers)
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_service_worker,
+                                            initargs=(args, warmup, warm_barrier))
+        # the pool starts its processes on submit (all at once with fork, one per waiting call with spawn /
+        # forkserver), one call per worker that only returns once every worker is warm
+        futures = [self.executor.submit(_wait_warm) for _ in range(self.workers)]
+        try:
+            for future in futures:
+                future.result(timeout=WARMUP_TIMEOUT)
+        except BaseException:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        print(f"{READY_MESSAGE} with {self.workers} warm workers", file=sys.stderr)
+
+    def submit(self, request):
+        """
+        returns a future of the result record, raises ValueError for a malformed request
+        """
+        return self.executor.submit(_solve, normalize_request(request, self.solver_keys))
+
+    def solve(self, request):
+        return self.submit(request).result()
+
+    def close(self):
+        self.executor.shutdown()
+        # removes the compiled krb and private cache directories of the worker processes
+        LogicInferenceEngine(self.args, load_dataset=False).cleanup()
+
+
+def error_response(request, message):
+    request_id = request.get('id') if isinstance(request, dict) else None
+    return {'id': request_id, 'error': message}
+
+
+def serve_stdio(service, out):
+    """
+    read one request per line until EOF, write each response as one line to `out` once it is done
+    """
+    lock = threading.Lock()
+
+    def respond(response):
+        with lock:
+            out.write(json.dumps(response, ensure_ascii=False) + '\n')
+            out.flush()
+
+    def on_done(request, future):
+        try:
+            respond(future.result())
+        except Exception as e:
+            respond(error_response(request, str(e)))
+
+    futures = []
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        request = None
+        try:
+            request = json.loads(line)
+            future = service.submit(request)
+        except ValueError as e:  # json.JSONDecodeError is a ValueError as well
+            respond(error_response(request, str(e)))
+            continue
+        future.add_done_callback(lambda f, request=request: on_done(request, f))
+        futures.append(future)
+    for future in futures:
+        future.exception()  # wait, callbacks write the responses
+
+
+def make_handler(service):
+    class SolverRequestHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip('/') == '/health':
+                self.send_json(200, {'status': 'ok', 'workers': service.workers})
+            else:
+                self.send_json(404, {'error': 'not found'})
+
+        def do_POST(self):
+            request = None
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                request = json.loads(self.rfile.read(length))
+                future = service.submit(request)
+            except ValueError as e:
+                self.send_json(400, error_response(request, str(e)))
+                return
+            try:
+                self.send_json(200, future.result())
+            except Exception as e:
+                self.send_json(500, error_response(request, str(e)))
+
+        def send_json(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # one line per request would flood stderr at a few hundred requests per minute
+
+    return SolverRequestHandler
+
+
+def serve_http(service, host, port):
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    print(f"Listening on http://{host}:{server.server_port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=None) # serve HTTP on this port instead of stdin / stdout
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1)) # warm worker processes
+    parser.add_argument('--no_warmup', action='store_true') # skip solving a synthetic example at worker start
+    service_args, engine_argv = parser.parse_known_args(argv)
+    engine_args = logic_inference.parse_args(engine_argv)
+    engine_args.workers = service_args.workers
+    return service_args, engine_args
+
+
+def main():
+    service_args, engine_args = parse_args()
+    out = None
+    if service_args.port is None:
+        # the solvers print progress to stdout, keep the protocol stream for responses only:
+        # fd 1 (inherited by the workers and their subprocesses) now goes to stderr
+        sys.stdout.flush()
+        out = os.fdopen(os.dup(1), 'w')
+        os.dup2(2, 1)
+    service = SolverService(engine_args, warmup=not service_args.no_warmup)
+    # stop on SIGTERM as on Ctrl-C, shutting the workers down and removing their caches
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        if service_args.port is None:
+            serve_stdio(service, out)
+        else:
+            serve_http(service, service_args.host, service_args.port)
+    finally:
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
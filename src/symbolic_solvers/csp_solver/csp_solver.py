@@ -1,12 +1,18 @@
 import os
 import func_timeout
 import re
+import time
 from collections import defaultdict
 
 class CSP_Program:
-    def __init__(self, logic_program:str, dataset_name:str) -> None:
+    def __init__(self, logic_program:str, dataset_name:str, timeout=None) -> None:
+        # optional time budget in seconds, it can only shorten the 20s limit of the solve
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.timings = {}  # seconds spent per stage
         self.logic_program = logic_program
+        start = time.perf_counter()
         self.flag = self.parse_logic_program()
+        self.timings['parse'] = time.perf_counter() - start
         self.dataset_name = dataset_name
         self.timeout = 20
 
@@ -45,8 +51,13 @@ class CSP_Program:
                 if debug_mode:
                     print(e)
                 return None, e
+        timeout = self.timeout
+        if self.deadline is not None:
+            timeout = min(timeout, self.deadline - time.monotonic())
+            if timeout <= 0:
+                return None, "time budget exhausted"
         try:
-            ans, error_msg = func_timeout.func_timeout(self.timeout, execute, args=(code_string,))
+            ans, error_msg = func_timeout.func_timeout(timeout, execute, args=(code_string,))
         except func_timeout.FunctionTimedOut:
             ans = None
             error_msg = "timeout"
@@ -96,6 +107,7 @@ class CSP_Program:
             return None, "Failed to import tracer module", ""
         
         # parse the logic program into CSP python program
+        start = time.perf_counter()
         python_program_list = [
             'from constraint import *', 
             'problem = Problem()'
@@ -134,16 +146,21 @@ class CSP_Program:
         python_program_list.append(f'ans = problem.getSolutions()')
         # execute the python program
         py_program_str = '\n'.join(python_program_list)
+        self.timings['codegen'] = time.perf_counter() - start
         if debug_mode:
             print(py_program_str)
         
+        start = time.perf_counter()
         result, err_msg = self.safe_execute(py_program_str, keys=["ans"], debug_mode=debug_mode)
+        self.timings['exec'] = time.perf_counter() - start
         if result is None:
             return None, err_msg, ""
         
         ans = result[0] if isinstance(result, list) else result
+        start = time.perf_counter()
         reasoning = tracer.get_trace()
         reasoning = tracer.trace_to_text(reasoning)
+        self.timings['trace_render'] = time.perf_counter() - start
         return ans, err_msg, reasoning
     
     def answer_mapping(self, answer):
@@ -1,28 +1,13 @@
 from nltk.tree import Tree
 from .fol_parser import FOL_Parser
-from concurrent.futures import ThreadPoolExecutor, TimeoutError, ProcessPoolExecutor
-import signal
 
-# def handler(signum, frame):
-#     raise Exception("Timeout!")
 
 class FOL_Formula:
     def __init__(self, str_fol) -> None:
+        # the parser runs in time linear in the formula, any thread can parse without a time limit
         self.parser = FOL_Parser()
+        tree = self.parser.parse_text_FOL_to_tree(str_fol)
 
-        def handler(signum, frame):
-            raise Exception("Timeout!")
-
-        # Set the signal handler and a 5-second alarm
-        signal.signal(signal.SIGALRM, handler)
-        signal.alarm(60)
-        try:
-            tree = self.parser.parse_text_FOL_to_tree(str_fol)
-        except Exception as exc:
-            tree = None
-            self.is_valid = False
-            return
-    
         self.tree = tree
         if tree is None:
             self.is_valid = False
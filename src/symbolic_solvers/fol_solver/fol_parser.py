@@ -1,14 +1,169 @@
-import nltk
+from nltk.tree import Tree
 import re
 
-class FOL_Parser:
-    def __init__(self) -> None:
-        self.op_ls = ['⊕', '∨', '∧', '→', '↔', '∀', '∃', '¬', '(', ')', ',']
+BINARY_OPS = ('⊕', '∨', '∧', '→', '↔')
+QUANTIFIERS = ('∀', '∃')
 
-        self.sym_reg = re.compile(r'[^⊕∨∧→↔∀∃¬(),]+')
+_WORD_REG = re.compile(r'[⊕∨∧→↔∀∃¬(),]|[^\s⊕∨∧→↔∀∃¬(),]+')  # an operator, or a run of other non-space characters
+_BINARY_OP_REG = re.compile(r'[⊕∨∧→↔]')
+_WORD_CHAR_REG = re.compile(r'\w')
+
+
+class _ParseError(Exception):
+    pass
+
+
+class _TreeParser:
+    """
+    recursive descent over the tokens of FOL_Parser.msplit, building the nltk.Tree of the grammar in
+    FOL_Parser in one pass: the ')' closing each '(' and the operators outside parentheses of each
+    parenthesised span are found up front, so every choice between alternatives is made by looking at a
+    token or two and no token is read twice
+
+    the grammar is ambiguous, the tree built is the one nltk's ChartParser used to return for it: F OP F
+    chains group to the left whatever the operators, a '¬' or '(' around the whole of an S is taken as
+    S -> '¬' S / '(' S ')' unless the S inside is an F, and every TERM is a CONST until symbol_resolution.
+    A '¬' in front of the first operand of an F OP F chain making up an S negates the whole chain when it
+    has an odd number of operands (the parse the chart completed first) and that operand otherwise
+    """
+    def __init__(self, tokens, sym_reg):
+        self.tokens = tokens
+        self.sym_reg = sym_reg
+        self.closing = {}  # index of '(' -> index of its ')'
+        # a span is the inside of a pair of parentheses (keyed by the index of its '(') or the whole formula
+        # (-1), the operators directly in it are counted once here for top_level_ops
+        self.span_of = []  # token index -> the innermost span it is in, '(' and ')' are in the outer one
+        self.ops_before = []  # token index -> operators directly in its span before it
+        self.span_ops = {}  # span -> operators directly in it
+        opened = [-1]
+        counts = [0]
+        for i, tok in enumerate(tokens):
+            if tok == ')':
+                if len(opened) == 1:
+                    raise _ParseError(f"unbalanced ')' at token {i}")
+                start = opened.pop()
+                self.closing[start] = i
+                self.span_ops[start] = counts.pop()
+            self.span_of.append(opened[-1])
+            self.ops_before.append(counts[-1])
+            if tok == '(':
+                opened.append(i)
+                counts.append(0)
+            elif tok in BINARY_OPS:
+                counts[-1] += 1
+        if len(opened) > 1:
+            raise _ParseError(f"unclosed '(' at token {opened[-1]}")
+        self.span_ops[-1] = counts[0]
+
+    def tok(self, i, j):
+        return self.tokens[i] if i < j else None
+
+    def is_symbol(self, i, j):
+        return i < j and self.sym_reg.match(self.tokens[i]) is not None
+
+    def expect_symbol(self, i, j, what):
+        if not self.is_symbol(i, j):
+            raise _ParseError(f'expected {what} at token {i}')
+        return self.tokens[i]
+
+    def S(self, i, j):
+        tok = self.tok(i, j)
+        if tok in QUANTIFIERS:
+            q, k = self.Q(i, j)
+            return Tree('S', [q, self.F(k, j)])
+        if tok == '¬' and self.negates_rest(i, j):
+            return Tree('S', ['¬', self.S(i + 1, j)])
+        if tok == '(' and self.closing[i] == j - 1:
+            inner = self.S(i + 1, j - 1)
+            if len(inner) == 1:  # S -> F
+                return Tree('S', [Tree('F', ['(', inner[0], ')'])])
+            return Tree('S', ['(', inner, ')'])
+        return Tree('S', [self.F(i, j)])
+
+    def negates_rest(self, i, j):
+        """whether the '¬' at i applies to all of [i + 1, j) rather than to the first operand of an F"""
+        nxt = self.tok(i + 1, j)
+        if nxt == '¬' or nxt in QUANTIFIERS:
+            return True
+        if nxt == '(' and self.closing[i + 1] == j - 1:
+            return True
+        if self.is_symbol(i + 1, j) and self.tok(i + 2, j) == '(' and self.closing[i + 2] == j - 1:
+            return True  # ¬ PRED ( TERMS )
+        return self.top_level_ops(i + 1, j) % 2 == 0
+
+    def top_level_ops(self, i, j):
+        """the number of operators in [i, j) outside parentheses, j is the end of the span i is in"""
+        if i >= j:
+            return 0
+        return self.span_ops[self.span_of[i]] - self.ops_before[i]
+
+    def Q(self, i, j):
+        """Q -> QUANT VAR | QUANT VAR Q, and the index after it"""
+        pairs = []
+        while self.tok(i, j) in QUANTIFIERS:
+            pairs.append((self.tokens[i], self.expect_symbol(i + 1, j, 'a variable')))
+            i += 2
+        q = None
+        for quant, var in reversed(pairs):
+            q = Tree('Q', [Tree('QUANT', [quant]), Tree('VAR', [var])] + ([q] if q is not None else []))
+        return q, i
+
+    def F(self, i, j):
+        """F over all of [i, j), F OP F chains built left to right"""
+        f, k = self.operand(i, j)
+        while k < j:
+            op = self.tokens[k]
+            if op not in BINARY_OPS:
+                raise _ParseError(f'expected an operator at token {k}, found {op!r}')
+            right, k = self.operand(k + 1, j)
+            f = Tree('F', [f, Tree('OP', [op]), right])
+        return f
+
+    def operand(self, i, j):
+        """an F other than F OP F starting at i, and the index after it"""
+        tok = self.tok(i, j)
+        if tok == '¬' and self.tok(i + 1, j) == '(':
+            end = self.closing[i + 1]
+            return Tree('F', ['¬', '(', self.F(i + 2, end), ')']), end + 1
+        if tok == '(':
+            end = self.closing[i]
+            return Tree('F', ['(', self.F(i + 1, end), ')']), end + 1
+        literal, k = self.L(i, j)
+        return Tree('F', [literal]), k
+
+    def L(self, i, j):
+        """L -> '¬' PRED '(' TERMS ')' | PRED '(' TERMS ')', and the index after it"""
+        children = []
+        if self.tok(i, j) == '¬':
+            children.append('¬')
+            i += 1
+        pred = self.expect_symbol(i, j, 'a predicate')
+        if self.tok(i + 1, j) != '(':
+            raise _ParseError(f"expected '(' at token {i + 1}")
+        end = self.closing[i + 1]
+        children += [Tree('PRED', [pred]), '(', self.TERMS(i + 2, end), ')']
+        return Tree('L', children), end + 1
+
+    def TERMS(self, i, j):
+        """TERMS -> TERM | TERM ',' TERMS over all of [i, j)"""
+        symbols = [self.expect_symbol(i, j, 'a term')]
+        k = i + 1
+        while k < j:
+            if self.tokens[k] != ',':
+                raise _ParseError(f"expected ',' at token {k}")
+            symbols.append(self.expect_symbol(k + 1, j, 'a term'))
+            k += 2
+        terms = None
+        for sym in reversed(symbols):
+            term = Tree('TERM', [Tree('CONST', [sym])])
+            terms = Tree('TERMS', [term] if terms is None else [term, ',', terms])
+        return terms
+
+
+class FOL_Parser:
+    """
+    parser of the FOL formulas, for the grammar
 
-        # modified a bit. 
-        self.cfg_template = """
         S -> F | Q F | '¬' S | '(' S ')'
         Q -> QUANT VAR | QUANT VAR Q
         F -> '¬' '(' F ')' | '(' F ')' | F OP F | L
@@ -17,27 +172,31 @@ class FOL_Parser:
         TERMS -> TERM | TERM ',' TERMS
         TERM -> CONST | VAR
         QUANT -> '∀' | '∃'
-        """
+
+    where VAR, PRED and CONST are any symbol of the formula; which of them a symbol is comes from its
+    position (symbol_resolution)
+    """
+    def __init__(self) -> None:
+        self.op_ls = ['⊕', '∨', '∧', '→', '↔', '∀', '∃', '¬', '(', ')', ',']
+
+        self.sym_reg = re.compile(r'[^⊕∨∧→↔∀∃¬(),]+')
 
     def parse_text_FOL_to_tree(self, rule_str):
         """
-            Parse a text FOL rule into nltk.tree
-            
+            Parse a text FOL rule into nltk.tree, in time linear in its length
+
             Returns: nltk.tree, or None if the parse fails
         """
         ## NOTE: currenly we don't support FOL string that does not follow the grammar defined above. 
         # rule_str = self.reorder_quantifiers(rule_str)
-    
-        r, parsed_fol_str = self.msplit(rule_str)
-        cfg_str = self.make_cfg_str(r)
 
-        grammar = nltk.CFG.fromstring(cfg_str)
-        parser = nltk.ChartParser(grammar)
-        # note this function might run forever if the string is not parsable
-        tree = parser.parse_one(r) 
-        
-        return tree
-    
+        r = self.join_symbols(self.split_words(rule_str))
+        try:
+            parser = _TreeParser(r, self.sym_reg)
+            return parser.S(0, len(r))
+        except (_ParseError, RecursionError):
+            return None
+
     def reorder_quantifiers(self, rule_str):
         matches = re.findall(r'[∃∀]\w', rule_str)
         for match in matches[::-1]:
@@ -45,37 +204,19 @@ class FOL_Parser:
         return rule_str
 
     def msplit(self, s):
-        for op in self.op_ls:
-            s = s.replace(op, ' %s ' % op)
-        r = [e.strip() for e in s.split()]
-        #remove ' from the string if it contains any: this causes error in nltk cfg parsing
-        r = [e.replace('\'', '') for e in r]
-        r = [e for e in r if e != '']
-        
-        # deal with symbols with spaces like "dc universe" and turn it to "DcUniverse"
-        res = []
-        cur_str_ls = []
-        for e in r:
-            if (len(e) > 1) and self.sym_reg.match(e):            
-                cur_str_ls.append(e[0].upper() + e[1:])            
-            else:
-                if len(cur_str_ls) > 0:
-                    res.extend([''.join(cur_str_ls), e])
-                else:
-                    res.extend([e])
-                cur_str_ls = []
-        if len(cur_str_ls) > 0:
-            res.append(''.join(cur_str_ls))
-        
+        """the tokens of `s` (parse_text_FOL_to_tree parses them) and its normalized text"""
+        r = self.split_words(s)
+        res = self.join_symbols(r)
+
         # re-generate the FOL string
         make_str_ls = []
         for ind, e in enumerate(r):
-            if re.match(r'[⊕∨∧→↔]', e):
+            if _BINARY_OP_REG.match(e):
                 make_str_ls.append(' %s ' % e)
-            elif re.match(r',', e):
+            elif e.startswith(','):
                 make_str_ls.append('%s ' % e)
             # a logical variable
-            elif (len(e) == 1) and re.match(r'\w', e):
+            elif (len(e) == 1) and _WORD_CHAR_REG.match(e):
                 if ((ind - 1) >= 0) and ((r[ind-1] == '∃') or (r[ind-1] == '∀')):
                     make_str_ls.append('%s ' % e)
                 else:
@@ -85,17 +226,29 @@ class FOL_Parser:
         
         return res, ''.join(make_str_ls)
 
+    def split_words(self, s):
+        """the operators (self.op_ls) and the words between them of `s`"""
+        #remove ' from the string if it contains any, symbols are written without them
+        r = [e.replace('\'', '') for e in _WORD_REG.findall(s)]
+        return [e for e in r if e != '']
+
+    def join_symbols(self, r):
+        # deal with symbols with spaces like "dc universe" and turn it to "DcUniverse"
+        res = []
+        cur_str_ls = []
+        for e in r:
+            if (len(e) > 1) and self.sym_reg.match(e):            
+                cur_str_ls.append(e[0].upper() + e[1:])            
+            else:
+                if len(cur_str_ls) > 0:
+                    res.extend([''.join(cur_str_ls), e])
+                else:
+                    res.extend([e])
+                cur_str_ls = []
+        if len(cur_str_ls) > 0:
+            res.append(''.join(cur_str_ls))
+        return res
 
-    def make_cfg_str(self, token_ls):
-        """
-        NOTE: since nltk does not support reg strs like \w+, we cannot separately recognize VAR, PRED, and CONST.
-        Instead, we first allow VAR, PRED, and CONST to be matched with all symbols found in the FOL; once the tree is
-        parsered, we then go back and figure out the exact type of each symbols
-        """
-        sym_ls = list(set([e for e in token_ls if self.sym_reg.match(e)]))
-        sym_str = ' | '.join(["'%s'" % s for s in sym_ls])
-        cfg_str = self.cfg_template + 'VAR -> %s\nPRED -> %s\nCONST -> %s' % (sym_str,sym_str,sym_str)
-        return cfg_str
 
     def find_variables(self, lvars, tree):
         if isinstance(tree, str):
@@ -1,3 +1,5 @@
+import threading
+
 from z3 import *
 from ply import lex, yacc
 from .Formula import FOL_Formula
@@ -27,44 +29,26 @@ QUANT -> '∀' | '∃'
 
 class Prover9_FOL_Formula:
     def __init__(self, fol_formula : FOL_Formula) -> None:
-        self.tokens = ['QUANT', 'VAR', 'NOT', 'LPAREN', 'RPAREN', 'OP', 'PRED', 'COMMA', 'CONST']
-
-        self.t_QUANT = r'∀|∃'
-        self.t_NOT = r'¬'
-        self.t_LPAREN = r'\('
-        self.t_RPAREN = r'\)'
-        self.t_OP = r'⊕|∨|∧|→|↔'
-        self.t_COMMA = r','
-
-        if len(fol_formula.variables) > 0:
-            self.t_VAR = r'|'.join(list(fol_formula.variables))
-        else:
-            self.t_VAR = r'x'
-        
-        if len(fol_formula.predicates) > 0:
-            self.t_PRED = r'|'.join(list(fol_formula.predicates))
-        else:
-            self.t_PRED = r'PRED'
-
-        if len(fol_formula.constants) > 0:
-            self.t_CONST = r'|'.join(list(fol_formula.constants))
-        else:
-            self.t_CONST = r'0'
-
-        self.precedence = (
-            ('left', 'OP'),
-            ('right', 'NOT'),
-        )
-
-        self.t_ignore = ' \t'
-        self.lexer = lex.lex(module=self)
-        self.parser = yacc.yacc(module=self, write_tables=False, debug=False)
-        
-        self.formula = self.parse(str(fol_formula))
-
-    def t_error(self, t):
-        # print(f"Illegal character {t.value[0]}")
-        t.lexer.skip(1)
+        # the leaves of the parse tree are the tokens of the formula; its text can not be lexed back without
+        # knowing the symbols, str(fol_formula) writes '∀xP(x)' for the quantifier of P(x)
+        # formula: the LADR text Prover9 reads, None if the tokens do not parse
+        self.formula = translate(fol_formula.tree.leaves())
+
+
+class _Prover9Grammar:
+    """
+    PLY grammar of the FOL tokens, the rules return the formula in LADR syntax
+
+    the text is the one nltk's convert_to_prover9 writes for the formula (every binary connective in
+    parentheses, `-(...)` for negations, no space between arguments), so Prover9 reads the same input and
+    writes the same log as it did when the formulas went through nltk logic expressions
+    """
+    tokens = ['QUANT', 'SYMBOL', 'NOT', 'LPAREN', 'RPAREN', 'OP', 'COMMA']
+
+    precedence = (
+        ('left', 'OP'),
+        ('right', 'NOT'),
+    )
 
     # S -> F
     def p_S_F(self, p):
@@ -73,21 +57,21 @@ class Prover9_FOL_Formula:
 
     # S -> QUANT VAR S
     def p_S_quantified_S(self, p):
-        '''expr : QUANT VAR expr'''
+        '''expr : QUANT SYMBOL expr'''
         if p[1] == "∀":
-            p[0] = f"all {p[2]}.({p[3]})"
+            p[0] = f"all {p[2]} {p[3]}"
         elif p[1] == "∃":
-            p[0] = f"some {p[2]}.({p[3]})"
+            p[0] = f"exists {p[2]} {p[3]}"
     
     # S -> '¬' S
     def p_S_not(self, p):
         '''expr : NOT expr'''
-        p[0] = f"not ({p[2]})"
+        p[0] = f"-({p[2]})"
 
     # F -> '¬' '(' F ')'
     def p_F_not(self, p):
         '''F : NOT LPAREN F RPAREN'''
-        p[0] = f"not ({p[3]})"
+        p[0] = f"-({p[3]})"
 
     # F -> '(' F ')'
     def p_F_paren(self, p):
@@ -96,22 +80,22 @@ class Prover9_FOL_Formula:
 
     # F -> Var
     def p_F_var(self, p):
-        '''F : VAR'''
+        '''F : SYMBOL'''
         p[0] = p[1]
 
     # F -> F OP F
     def p_F_op(self, p):
         '''F : F OP F'''
         if p[2] == "⊕":
-            p[0] = f"(({p[1]}) & not ({p[3]})) | (not ({p[1]}) & ({p[3]}))"
+            p[0] = f"(({p[1]} & -({p[3]})) | (-({p[1]}) & {p[3]}))"
         elif p[2] == "∨":
-            p[0] = f"({p[1]}) | ({p[3]})"
+            p[0] = f"({p[1]} | {p[3]})"
         elif p[2] == "∧":
-            p[0] = f"({p[1]}) & ({p[3]})"
+            p[0] = f"({p[1]} & {p[3]})"
         elif p[2] == "→":
-            p[0] = f"({p[1]}) -> ({p[3]})"
+            p[0] = f"({p[1]} -> {p[3]})"
         elif p[2] == "↔":
-            p[0] = f"({p[1]}) <-> ({p[3]})"
+            p[0] = f"({p[1]} <-> {p[3]})"
 
     # F -> L
     def p_F_L(self, p):
@@ -120,12 +104,12 @@ class Prover9_FOL_Formula:
 
     # L -> '¬' PRED '(' TERMS ')'
     def p_L_not(self, p):
-        '''L : NOT PRED LPAREN TERMS RPAREN'''
-        p[0] = f"not {p[2]}({p[4]})"
+        '''L : NOT SYMBOL LPAREN TERMS RPAREN'''
+        p[0] = f"-({p[2]}({p[4]}))"
 
     # L -> PRED '(' TERMS ')'
     def p_L_pred(self, p):
-        '''L : PRED LPAREN TERMS RPAREN'''
+        '''L : SYMBOL LPAREN TERMS RPAREN'''
         p[0] = f"{p[1]}({p[3]})"
 
     # TERMS -> TERM
@@ -136,24 +120,53 @@ class Prover9_FOL_Formula:
     # TERMS -> TERM ',' TERMS
     def p_TERMS_TERM_TERMS(self, p):
         '''TERMS : TERM COMMA TERMS'''
-        p[0] = f"{p[1]}, {p[3]}"
-
-    # TERM -> CONST
-    def p_TERM_CONST(self, p):
-        '''TERM : CONST'''
-        p[0] = p[1]
+        p[0] = f"{p[1]},{p[3]}"
 
-    # TERM -> VAR
-    def p_TERM_VAR(self, p):
-        '''TERM : VAR'''
+    # TERM -> CONST | VAR
+    def p_TERM(self, p):
+        '''TERM : SYMBOL'''
         p[0] = p[1]
 
     def p_error(self, p):
         # print("Syntax error at '%s'" % p.value)
         pass
 
-    def parse(self, s):
-        return self.parser.parse(s, lexer=self.lexer)
+
+# the token type of each leaf that is not a variable, predicate or constant (SYMBOL)
+_TOKEN_TYPES = {'∀': 'QUANT', '∃': 'QUANT', '¬': 'NOT', '(': 'LPAREN', ')': 'RPAREN', ',': 'COMMA',
+                '⊕': 'OP', '∨': 'OP', '∧': 'OP', '→': 'OP', '↔': 'OP'}
+
+_parser = None
+_parser_lock = threading.Lock()
+
+
+class _LeafLexer:
+    """feeds the leaves of a FOL parse tree to the PLY parser"""
+    def __init__(self, leaves):
+        self.leaves = iter(enumerate(leaves))
+
+    def token(self):
+        pos, leaf = next(self.leaves, (None, None))
+        if leaf is None:
+            return None
+        tok = lex.LexToken()
+        tok.type, tok.value, tok.lineno, tok.lexpos = _TOKEN_TYPES.get(leaf, 'SYMBOL'), leaf, 1, pos
+        return tok
+
+
+def translate(leaves):
+    """
+    the formula with these tokens (the leaves of its FOL_Formula tree) in LADR syntax, None if they do not
+    parse
+
+    the LALR tables are built once per process, on first use; the PLY parser keeps the state of the tokens it
+    is working on, so translations are serialized (each is a single pass over the tokens)
+    """
+    global _parser
+    with _parser_lock:
+        if _parser is None:
+            _parser = yacc.yacc(module=_Prover9Grammar(), write_tables=False, debug=False)
+        return _parser.parse(lexer=_LeafLexer(leaves))
 
 if __name__ == "__main__":
     # str_fol = '\u2203x \u2203y (Czech(x) \u2227 Book(y) \u2227 Author(x, y) \u2227 Publish(y, year1946))'
@@ -1,10 +1,11 @@
+import asyncio
 import os
 import re
 import sys
-from nltk.inference.prover9 import *
-from nltk.sem.logic import NegatedExpression
+import time
 import subprocess, shutil
-import tempfile, textwrap, itertools as it
+import itertools as it
+from concurrent.futures import ThreadPoolExecutor
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.join(current_dir, '..', '..', '..')
@@ -19,43 +20,127 @@ os.environ['PROVER9'] = PROVER9_PATH # Linux version
 # os.environ['PROVER9'] = '/opt/homebrew/bin'  # macOS version installed via Homebrew
 
 
-# --- helper utilities for raw prover9 interaction starts (for result with unkown)---
-def _build_p9_input(assumptions: list[str], goal: str, max_seconds: int = 10) -> str:
-    """Build a prover9 input string using NLTK's conversion utilities."""
-    from nltk.inference.prover9 import Expression, convert_to_prover9
+# prover9 exit codes other than 0 (proof found) and 2 (sos empty), as nltk reports them
+P9_RETURN_CODES = {
+    1: "(FATAL)",  # A fatal error occurred (user's syntax error).
+    3: "(MAX_MEGS)",  # The max_megs (memory limit) parameter was exceeded.
+    4: "(MAX_SECONDS)",  # The max_seconds parameter was exceeded.
+    5: "(MAX_GIVEN)",  # The max_given parameter was exceeded.
+    6: "(MAX_KEPT)",  # The max_kept parameter was exceeded.
+    7: "(ACTION)",  # A Prover9 action terminated the search.
+    101: "(SIGSEGV)",  # Prover9 crashed, most probably due to a bug.
+}
 
-    ass_exprs = [Expression.fromstring(a) for a in assumptions]
-    goal_expr = Expression.fromstring(goal)
-    ass_strs = convert_to_prover9(ass_exprs)
-    goal_str = convert_to_prover9(goal_expr)
 
-    ass_block = "\n".join(a + "." for a in ass_strs)
-    return textwrap.dedent(
-        f"""
-        assign(max_seconds,{max_seconds}).
-        clear(auto_denials).
+class Prover9Error(Exception):
+    def __init__(self, returncode: int, stdout: str):
+        msg = P9_RETURN_CODES.get(returncode, "(EXIT %d)" % returncode)
+        errormsgprefix = "%%ERROR:"
+        if errormsgprefix in stdout:
+            msg += "\n%s" % stdout[stdout.index(errormsgprefix):].strip()
+        super().__init__(msg)
+        self.returncode = returncode
 
-        formulas(assumptions).
-        {ass_block}
-        end_of_list.
 
-        formulas(goals).
-        {goal_str}.
-        end_of_list.
+def _prover9_input(assumptions: list[str], goal: str, max_seconds: int) -> str:
     """
-    )
+    prover9 input proving `goal` from `assumptions` (LADR formulas, see Prover9_FOL_Formula), written as
+    nltk's Prover9Command writes it, so the logs and proofs are the same
+    """
+    s = "assign(max_seconds, %d).\n\n" % max_seconds + "clear(auto_denials).\n"  # only one proof required
+    if assumptions:
+        s += "formulas(assumptions).\n"
+        for assumption in assumptions:
+            s += "    %s.\n" % assumption
+        s += "end_of_list.\n\n"
+    s += "formulas(goals).\n"
+    s += "    %s.\n" % goal
+    s += "end_of_list.\n\n"
+    return s
+
+
+async def _communicate(cmd: list[str], input_str: str | None, timeout: float | None = None,
+                       stderr=subprocess.STDOUT) -> tuple[str, int]:
+    """Run `cmd` as an asyncio subprocess, killing it if it outlives `timeout`."""
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=subprocess.PIPE if input_str is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE, stderr=stderr)
+    data = input_str.encode("utf8") if input_str is not None else None
+    try:
+        stdout, _ = await asyncio.wait_for(proc.communicate(data), timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+        try:
+            proc.kill()
+        except ProcessLookupError:  # already exited
+            pass
+        await proc.wait()
+        if isinstance(e, asyncio.TimeoutError):
+            raise subprocess.TimeoutExpired(cmd, timeout)
+        raise
+    return stdout.decode("utf-8"), proc.returncode
+
 
+async def _prove_async(p9_input: str) -> tuple[bool, str]:
+    """runs prover9 on `p9_input`, returns whether a proof was found together with the raw prover9 output."""
+    stdout, returncode = await _communicate([os.path.join(PROVER9_PATH, "prover9")], p9_input)
+    if returncode not in [0, 2]:
+        raise Prover9Error(returncode, stdout)
+    return returncode == 0, stdout
 
-def _run_prover9_raw(p9_input: str, timeout: int = 12) -> str:
-    with tempfile.NamedTemporaryFile(mode="w+", delete=False) as tf:
-        tf.write(p9_input)
-        tf.flush()
-        cmd = [os.path.join(PROVER9_PATH, "prover9"), "-f", tf.name]
-        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
-    os.unlink(tf.name)
-    return proc.stdout
 
+async def _simplify_proof_async(proof_string: str) -> str:
+    """the proof found by prover9 without the labels of its steps (`prooftrans striplabels`)."""
+    stdout, _ = await _communicate([os.path.join(PROVER9_PATH, "prooftrans"), "striplabels"], proof_string)
+    return stdout.rstrip()
 
+
+async def _race_proofs(goal_input: str, neg_input: str,
+                       timeout: float | None = None) -> tuple[int | None, list[str | None]]:
+    """
+    runs prover9 on the goal and on its negation at once and kills the runs still going once it is decided.
+    A proof of the goal takes precedence: inconsistent premises prove both, so once the negation is proved
+    the goal run is still waited for (within `timeout`) and the answer does not depend on which run ends first.
+
+    Returns:
+        (0 for the goal, 1 for the negation, None once both ended without a proof, the raw output of each
+        run, None for a killed one); a prover9 error is raised only when there is no proof, the one of the
+        goal first, and TimeoutError when `timeout` runs out before any proof
+    """
+    loop = asyncio.get_running_loop()
+    end = None if timeout is None else loop.time() + timeout
+    tasks = [asyncio.ensure_future(_prove_async(p9_input)) for p9_input in (goal_input, neg_input)]
+    goal_task, neg_task = tasks
+
+    def proved(task):
+        return task.done() and task.exception() is None and task.result()[0]
+
+    try:
+        pending = set(tasks)
+        while pending:
+            left = None if end is None else end - loop.time()
+            done, pending = await asyncio.wait(pending, timeout=left, return_when=asyncio.FIRST_COMPLETED)
+            if not done:  # out of time
+                break
+            if proved(goal_task):
+                return 0, [goal_task.result()[1], None]
+        if proved(neg_task):
+            return 1, [None, neg_task.result()[1]]
+        if pending:
+            raise TimeoutError('time budget exhausted')
+        for task in tasks:
+            if task.exception() is not None:
+                raise task.exception()
+        # the search logs of both runs, as the Unknown trace shows them
+        return None, [task.result()[1] for task in tasks]
+    finally:
+        # kills the run still going, see _communicate
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# --- summary of the search logs of the two runs (for result with unkown)---
 _LINE_PAT = re.compile(r"^(Derived:|kept:|given\s+#\d+|-\w|\w).*?\[.*\]")
 
 
@@ -114,16 +199,53 @@ def _summarise_log(log: str, max_lines: int | None = None) -> str:
              "-- Search terminated, no contradiction found --"
     return "\n".join(out) + f"\n{reason}"
 
-# --- helper utilities for raw prover9 interaction ends ---
-
 
 
 class FOL_Prover9_Program:
-    def __init__(self, logic_program:str, dataset_name = 'FOLIO') -> None:
+    # per-stage limits in seconds, a time budget can only shorten them
+    prove_timeout = 10
+
+    def __init__(self, logic_program:str, dataset_name = 'FOLIO', timeout=None) -> None:
+        """
+        Args:
+            timeout (float): optional time budget in seconds for parsing and executing, None for no limit
+        """
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.budget_exhausted = False  # set when parsing ran out of budget rather than failed
+        self.timings = {}  # seconds spent per stage, summed over repeated calls
         self.logic_program = logic_program
         self.flag = self.parse_logic_program()
         self.dataset_name = dataset_name
 
+    def _add_time(self, stage, start):
+        self.timings[stage] = self.timings.get(stage, 0.0) + time.perf_counter() - start
+
+    def _time_left(self, limit):
+        """`limit` shortened to what is left of the time budget"""
+        if self.deadline is None:
+            return limit
+        return min(limit, self.deadline - time.monotonic())
+
+    def _parse_formula(self, str_fol):
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.budget_exhausted = True
+            return None
+        start = time.perf_counter()
+        fol_rule = FOL_Formula(str_fol)
+        self._add_time('fol_parse', start)
+        return fol_rule if fol_rule.is_valid else None
+
+    def _stage_limit(self, limit):
+        """time limit of the next stage, raises TimeoutError once the time budget is spent"""
+        left = self._time_left(limit)
+        if left <= 0:
+            raise TimeoutError('time budget exhausted')
+        return left
+
+    def _max_seconds(self):
+        """prover9 `max_seconds` of the next run, which takes whole seconds (0 would mean no limit)"""
+        return max(1, int(self._stage_limit(self.prove_timeout)))
+
     def parse_logic_program(self):
         try:        
             # Split the string into premises and conclusion
@@ -140,69 +262,94 @@ class FOL_Prover9_Program:
             # convert to prover9 format
             self.prover9_premises = []
             for premise in self.logic_premises:
-                fol_rule = FOL_Formula(premise)
-                if fol_rule.is_valid == False:
+                fol_rule = self._parse_formula(premise)
+                if fol_rule is None:
                     return False
+                start = time.perf_counter()
                 prover9_rule = Prover9_FOL_Formula(fol_rule)
+                self._add_time('ply_translate', start)
+                if prover9_rule.formula is None:
+                    return False
                 self.prover9_premises.append(prover9_rule.formula)
 
-            fol_conclusion = FOL_Formula(self.logic_conclusion)
-            if fol_conclusion.is_valid == False:
+            fol_conclusion = self._parse_formula(self.logic_conclusion)
+            if fol_conclusion is None:
                 return False
+            start = time.perf_counter()
             self.prover9_conclusion = Prover9_FOL_Formula(fol_conclusion).formula
-            return True
+            self._add_time('ply_translate', start)
+            return self.prover9_conclusion is not None
         except:
             return False
 
     def execute_program(self):
+        # the prover9 runs of the goal and of its negation are raced as asyncio subprocesses
         try:
-            goal = Expression.fromstring(self.prover9_conclusion)
-            assumptions = [Expression.fromstring(a) for a in self.prover9_premises]
-            timeout = 10
-            #prover = Prover9()
-            #result = prover.prove(goal, assumptions)
-            
-            prover = Prover9Command(goal, assumptions, timeout=timeout)
-            result = prover.prove()
-            # print(prover.proof())
-
-            proof_trace = ''
-
-            if result:
-                # 证明成功：记录原结论的推导路径
-                proof_core = self._extract_proof_steps_ture_false(prover.proof(simplify=True))
-                proof_trace = 'prove original conclusion:\n' + proof_core
-                return 'True', '', proof_trace
-            else:
-                # 证明失败，尝试证明结论的否定
-                proof_trace += 'prove original conclusion:\n' + prover.proof(simplify=False) + '\n'
-
-                negated_goal = NegatedExpression(goal)
-                prover_neg = Prover9Command(negated_goal, assumptions, timeout=timeout)
-                negation_result = prover_neg.prove()
-
-                if negation_result:
-                    # 证明否定成功 => 原结论为 False，只输出成功证明路径
-                    proof_core = self._extract_proof_steps_ture_false(prover_neg.proof(simplify=True))
-                    proof_trace = 'prove negation of original conclusion:\n' + proof_core
-                    return 'False', '', proof_trace
-                else:
-                    # 两次证明都失败，结论未知 → 调命令行版抓完整日志
-                    orig_in  = _build_p9_input(self.prover9_premises, self.prover9_conclusion)
-                    orig_log = _run_prover9_raw(orig_in, timeout=timeout+2)
-                    orig_tr  = _summarise_log(orig_log)
-
-                    neg_goal = f"-({self.prover9_conclusion})"
-                    neg_in   = _build_p9_input(self.prover9_premises, neg_goal)
-                    neg_log  = _run_prover9_raw(neg_in, timeout=timeout+2)
-                    neg_tr   = _summarise_log(neg_log)
-
-                    proof_trace = (f"trying to prove original conclusion:\n{orig_tr}\n\n"
-                                   f"trying to prove negation of original conclusion:\n{neg_tr}\n\n"
-                                   f"So: Unknown")
-                    return 'Unknown', '', proof_trace
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.async_execute_program())
+        # asyncio.run cannot be nested in the loop of the caller (e.g. a notebook), the race then gets a loop
+        # of its own in a worker thread; callers that are coroutines should await async_execute_program
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, self.async_execute_program()).result()
+
+    def _budget_left(self):
+        """seconds left of the time budget, None for no budget"""
+        return None if self.deadline is None else self.deadline - time.monotonic()
+
+    async def _within_budget(self, aw):
+        """
+        awaits `aw`, cancelling it once the time budget is spent, which kills the prover9 / prooftrans
+        processes it runs (see _communicate), and raising TimeoutError then
+        """
+        if self.deadline is None:
+            return await aw
+        try:
+            return await asyncio.wait_for(aw, self._budget_left())
+        except asyncio.TimeoutError:
+            raise TimeoutError('time budget exhausted') from None
+
+    async def async_execute_program(self):
+        """
+        proves the conclusion and its negation at once, every prover9 / prooftrans call is an asyncio
+        subprocess, so that it can also overlap with the other solvers of an example.
+        """
+        try:
+            goal = self.prover9_conclusion
+            assumptions = self.prover9_premises
+
+            max_seconds = self._max_seconds()
+            goal_input = _prover9_input(assumptions, goal, max_seconds)
+            neg_input = _prover9_input(assumptions, f"-({goal})", max_seconds)
+            start = time.perf_counter()
+            # prover9 checks max_seconds against its own clock, the wait is bounded by the budget as well
+            proved, logs = await _race_proofs(goal_input, neg_input, self._budget_left())
+            self._add_time('prover9_race', start)
+            if proved is not None:
+                # 证明成功：记录原结论（或其否定）的推导路径
+                start = time.perf_counter()
+                simplified = await self._within_budget(_simplify_proof_async(logs[proved]))
+                self._add_time('prooftrans', start)
+                proof_core = self._extract_proof_steps_ture_false(simplified)
+                if proved == 0:
+                    return 'True', '', 'prove original conclusion:\n' + proof_core
+                return 'False', '', 'prove negation of original conclusion:\n' + proof_core
+
+            # 两次证明都失败，结论未知 → 两次运行的完整日志
+            start = time.perf_counter()
+            trace = self._unknown_trace(*logs)
+            self._add_time('log_summary', start)
+            return 'Unknown', '', trace
         except Exception as e:
-            return None, str(e), '' 
+            return None, str(e), ''
+
+    @staticmethod
+    def _unknown_trace(orig_log: str, neg_log: str) -> str:
+        orig_tr = _summarise_log(orig_log)
+        neg_tr  = _summarise_log(neg_log)
+        return (f"trying to prove original conclusion:\n{orig_tr}\n\n"
+                f"trying to prove negation of original conclusion:\n{neg_tr}\n\n"
+                f"So: Unknown")
         
     def answer_mapping(self, answer):
         if answer == 'True':
@@ -0,0 +1,374 @@
+"""
+in-process forward chaining for the LP language (`Pred(args, bool) && ... >>> ...`)
+
+Pyke_Program used to write facts.kfb / rules.krb, have Pyke compile them into a python package and
+import it on every call. ForwardChainingEngine evaluates the same programs without any file I/O: facts
+are kept per predicate together with Pyke's hash indexes ((arity, bound argument positions) -> values
+of the bound arguments -> remaining arguments of the matching facts), and rules fire in exactly the
+order of Pyke's compiled rules, so that answers and the `Use ruleN` / `Bind` / `Obtain ...` trace are
+the ones pyke_trace records for the Pyke engine. The firing is depth first as in Pyke, but driven from an
+explicit stack (see _run) instead of recursive calls, so long derivation chains do not hit Python's recursion
+limit (Pyke itself does, at a chain of a couple hundred rules).
+
+Only the subset of the kfb / krb syntax that LP programs use is accepted; anything else raises
+UnsupportedProgram and is left to Pyke, which then reports its own error.
+"""
+import re
+import time
+from functools import lru_cache
+
+from symbolic_solvers.pyke_solver.trace_events import BIND, FINISH, KNOWN_FACT, NEW_FACT, REUSE, UNBIND, USE
+
+
+class UnsupportedProgram(Exception):
+    pass
+
+
+# keywords of Pyke's scanner, an identifier spelled like one of these is a syntax error there
+KFB_KEYWORDS = frozenset(('False', 'None', 'True'))
+KRB_KEYWORDS = frozenset((
+    'as', 'assert', 'bc_extras', 'check', 'extending', 'False', 'fc_extras', 'first', 'forall',
+    'foreach', 'in', 'None', 'notany', 'plan_extras', 'python', 'require', 'step', 'taking', 'True',
+    'use', 'when', 'with', 'without',
+))
+_CONSTANTS = {'True': True, 'False': False, 'None': None}
+
+_IDENTIFIER = re.compile(r'[a-zA-Z_][a-zA-Z0-9_]*')
+_INTEGER = re.compile(r'[1-9][0-9]*|0')
+_PATTERN_VAR = re.compile(r'\$[a-zA-Z][a-zA-Z0-9_]*')
+
+
+class Var:
+    """a pattern variable of a rule, `$x`"""
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return '$' + self.name
+
+
+def parse_data(token, keywords=KRB_KEYWORDS):
+    """
+    a constant as Pyke reads it: identifiers are strings, True / False / None and integers python values
+    """
+    token = token.strip()
+    if token in _CONSTANTS:
+        return _CONSTANTS[token]
+    if _IDENTIFIER.fullmatch(token) and token not in keywords:
+        return token
+    if _INTEGER.fullmatch(token):
+        return int(token)
+    raise UnsupportedProgram(f'unsupported constant: {token!r}')
+
+
+@lru_cache(maxsize=65536)
+def _parse_arg(token, keywords, allow_vars):
+    # the same few names and constants come back in every fact and rule
+    token = token.strip()
+    if allow_vars and token.startswith('$'):
+        if not _PATTERN_VAR.fullmatch(token):
+            raise UnsupportedProgram(f'unsupported variable: {token!r}')
+        return Var(token[1:])
+    return parse_data(token, keywords)
+
+
+@lru_cache(maxsize=65536)
+def convert_atom(name, args, keywords, allow_vars):
+    """name and argument texts (of an lp_parser.Atom) -> (name, args), args are constants or (if allowed) Var"""
+    if not _IDENTIFIER.fullmatch(name) or name in keywords:
+        raise UnsupportedProgram(f'unsupported predicate name: {name!r}')
+    return name, tuple(_parse_arg(token, keywords, allow_vars) for token in args)
+
+
+class Rule:
+    __slots__ = ('name', 'premises', 'conclusions', 'ran', 'plans')
+
+    def __init__(self, name, premises, conclusions):
+        self.name = name
+        self.premises = premises        # [(fact name, arg patterns)], the foreach clause
+        self.conclusions = conclusions  # [(fact name, arg patterns)], the assert clause
+        self.ran = False
+        self.plans = {}                 # (index, level) -> lookup plan, see plan()
+
+    def plan(self, index, level):
+        """
+        how the premise at `level` is looked up when the rule was triggered by premise `index` (None for
+        a run): which variables are bound then only depends on the premises matched before, so the bound
+        argument positions are fixed per (index, level)
+
+        returns: (fact name, arity, bound indices, [(bound variable or None, literal)], other variables)
+        """
+        plan = self.plans.get((index, level))
+        if plan is None:
+            bound = set()
+            for i, (_, patterns) in enumerate(self.premises[:level]):
+                bound.update(p.name for p in patterns if isinstance(p, Var))
+            if index is not None and index > level:
+                bound.update(p.name for p in self.premises[index][1] if isinstance(p, Var))
+            name, patterns = self.premises[level]
+            indices = tuple(i for i, p in enumerate(patterns) if not isinstance(p, Var) or p.name in bound)
+            key = tuple((patterns[i].name, None) if isinstance(patterns[i], Var) else (None, patterns[i])
+                        for i in indices)
+            others = tuple(patterns[i].name for i in range(len(patterns)) if i not in indices)
+            plan = self.plans[index, level] = (name, len(patterns), indices, key, others)
+        return plan
+
+
+def convert_facts(atoms):
+    """[lp_parser.Atom] -> [(name, args)]"""
+    return [convert_atom(atom.name, atom.args, KFB_KEYWORDS, allow_vars=False) for atom in atoms]
+
+
+def convert_rule(name, rule):
+    """lp_parser.Rule -> Rule"""
+    return Rule(name,
+                [convert_atom(atom.name, atom.args, KRB_KEYWORDS, allow_vars=True) for atom in rule.premises],
+                [convert_atom(atom.name, atom.args, KRB_KEYWORDS, allow_vars=True) for atom in rule.conclusions])
+
+
+class FactList:
+    """the facts of one predicate, mirrors pyke.fact_base.fact_list"""
+    __slots__ = ('name', 'facts', 'known', 'hashes', 'rule_refs')
+
+    def __init__(self, name):
+        self.name = name
+        self.facts = []      # universal facts first, then the asserted ones in order
+        self.known = set()
+        self.hashes = {}     # (arity, bound indices) -> (other indices, {bound values: [other values]})
+        self.rule_refs = []  # (rule, foreach index) to notify of new facts
+
+    def add(self, args):
+        self.facts.append(args)
+        self.known.add(args)
+        for (length, indices), (other_indices, arg_map) in self.hashes.items():
+            if length == len(args):
+                arg_map.setdefault(tuple(args[i] for i in indices), []).append(
+                    tuple(args[i] for i in other_indices))
+
+    def lookup(self, length, indices, values):
+        """
+        other indices and the list of their values over the facts matching `values` at `indices`; the
+        list is live, facts added while it is iterated are seen as well (as in Pyke)
+        """
+        entry = self.hashes.get((length, indices))
+        if entry is None:
+            other_indices = tuple(i for i in range(length) if i not in indices)
+            arg_map = {}
+            for args in self.facts:
+                if len(args) == length:
+                    arg_map.setdefault(tuple(args[i] for i in indices), []).append(
+                        tuple(args[i] for i in other_indices))
+            entry = self.hashes[length, indices] = (other_indices, arg_map)
+        other_indices, arg_map = entry
+        return other_indices, arg_map.get(values, ())
+
+
+class ForwardChainingEngine:
+    def __init__(self, facts, rules, deadline=None):
+        """
+        Args:
+            facts: [(name, args)] as returned by convert_facts, the universal facts
+            rules: [Rule], in the order of the rule base
+            deadline (float): time.monotonic() value after which firing a rule raises TimeoutError
+        """
+        self.fact_lists = {}
+        self.rules = rules
+        self.deadline = deadline
+        # the trace, as recorded by pyke_trace for the Pyke engine (see trace_events)
+        self.events = []
+        self.new_facts = set()  # {(name, args)}
+        # (name, args) -> (rule name, premise facts) of the first derivation of each implied fact, see proof_dag
+        self.derivations = {}
+        self.used = set()
+        self.active_rule = None
+        self.watched = None  # fact list whose new facts go to _check_settled, see GoalDirectedEngine
+        for name, args in facts:
+            fact_list = self.get_fact_list(name)
+            if args not in fact_list.known:
+                fact_list.add(args)
+
+    def get_fact_list(self, name):
+        fact_list = self.fact_lists.get(name)
+        if fact_list is None:
+            fact_list = self.fact_lists[name] = FactList(name)
+        return fact_list
+
+    def activate(self):
+        """register every rule with the predicates of its premises, then run the rules in order"""
+        self._run_rules(self.rules)
+
+    def add_rules(self, rules):
+        """
+        add rules to an activated engine: they are run on the current facts, and what they derive fires the
+        other rules through the fact lists as usual
+        """
+        self.rules = self.rules + list(rules)
+        self._run_rules(rules)
+
+    def add_facts(self, facts):
+        """assert universal facts [(name, args)] into an activated engine, firing the rules they match"""
+        for name, args in facts:
+            self._run(self._assert(name, args))
+
+    def labels(self, name, subject):
+        """the values of $label in the facts `name(subject, $label)`"""
+        fact_list = self.fact_lists.get(name)
+        if fact_list is None:
+            return []
+        _, rows = fact_list.lookup(2, (0,), (subject,))
+        return [row[0] for row in rows]
+
+    # ------------------------------------------------------------------
+    # rule firing, following pyke.fc_rule and the rule functions Pyke compiles
+    #
+    # Pyke fires the rules a new fact matches as soon as it is asserted, from inside the loops of the rule
+    # that asserted it, so its call stack grows with the length of the derivation chain (and a long chain
+    # hits the recursion limit). _assert, _new_fact and _foreach keep that depth-first order but are
+    # generators: a step that would recurse into asserting a fact yields the generator of that assertion
+    # instead, and _run drives them from an explicit stack. Python's own stack is then bounded by the
+    # number of premises of a rule, whatever the length of the chains.
+
+    @staticmethod
+    def _run(steps):
+        """run the generator `steps` and every generator it (or one of them) yields, depth first"""
+        stack = [steps]
+        error = None
+        while stack:
+            try:
+                step = stack[-1].throw(error) if error is not None else next(stack[-1])
+            except StopIteration:
+                stack.pop()
+                continue
+            except BaseException as e:
+                # unwinds the frames above as the recursive calls did, running their finally clauses
+                stack.pop()
+                if not stack:
+                    raise
+                error = e
+                continue
+            error = None
+            stack.append(step)
+
+    def _run_rules(self, rules):
+        for rule in rules:
+            rule.ran = False
+            for index, (name, _) in enumerate(rule.premises):
+                self.get_fact_list(name).rule_refs.append((rule, index))
+        for rule in rules:
+            self._rule_start(rule)
+            try:
+                rule.ran = True
+                self._run(self._foreach(rule, {}, None, 0))
+            finally:
+                self._rule_end(rule)
+
+    def _rule_start(self, rule):
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise TimeoutError('time budget exhausted')
+        self.events.append((USE if rule.name not in self.used else REUSE, rule.name))
+        self.used.add(rule.name)
+        self.active_rule = rule.name
+
+    def _rule_end(self, rule):
+        self.events.append((FINISH, rule.name))
+        # also after a rule fired by a fact another rule asserted, like pyke_trace
+        self.active_rule = None
+
+    def _bind(self, bindings, name, value):
+        bindings[name] = value
+        if self.active_rule:
+            self.events.append((BIND, name, value))
+
+    def _unbind(self, bindings, name):
+        if self.active_rule:
+            self.events.append((UNBIND, name))
+        del bindings[name]
+
+    def _new_fact(self, rule, args, index):
+        """a fact was asserted for the premise `index` of `rule`"""
+        self._rule_start(rule)
+        try:
+            if not rule.ran:
+                return
+            patterns = rule.premises[index][1]
+            if len(args) != len(patterns):
+                return
+            # these bindings belong to a fresh context and are never undone (nor traced as such)
+            bindings = {}
+            for pattern, value in zip(patterns, args):
+                if isinstance(pattern, Var):
+                    if pattern.name in bindings:
+                        if bindings[pattern.name] != value:
+                            return
+                    else:
+                        self._bind(bindings, pattern.name, value)
+                elif pattern != value:
+                    return
+            yield from self._foreach(rule, bindings, index, 0)
+        finally:
+            self._rule_end(rule)
+
+    def _foreach(self, rule, bindings, index, level):
+        """the nested loops over the premises, the one at `index` is already matched"""
+        if level == len(rule.premises):
+            for name, patterns in rule.conclusions:
+                args = []
+                for pattern in patterns:
+                    if isinstance(pattern, Var):
+                        if pattern.name not in bindings:
+                            raise KeyError(f"${pattern.name} not bound")
+                        args.append(bindings[pattern.name])
+                    else:
+                        args.append(pattern)
+                yield self._assert(name, tuple(args), rule, bindings)
+            return
+        if level == index:
+            yield from self._foreach(rule, bindings, index, level + 1)
+            return
+
+        name, length, indices, key, others = rule.plan(index, level)
+        values = tuple([bindings[var] if var is not None else literal for var, literal in key])
+        _, rows = self.fact_lists[name].lookup(length, indices, values)
+        if not others:
+            for _ in rows:
+                yield from self._foreach(rule, bindings, index, level + 1)
+            return
+        for row in rows:
+            bound = []
+            try:
+                for var, value in zip(others, row):
+                    if var in bindings:  # the same variable twice in the premise
+                        if bindings[var] != value:
+                            break
+                    else:
+                        self._bind(bindings, var, value)
+                        bound.append(var)
+                else:
+                    yield from self._foreach(rule, bindings, index, level + 1)
+            finally:
+                for var in bound:
+                    self._unbind(bindings, var)
+
+    def _assert(self, name, args, rule=None, bindings=None):
+        """assert the fact name(args), derived by `rule` with `bindings` (None for a universal fact)"""
+        fact_list = self.get_fact_list(name)
+        known = args in fact_list.known
+        if self.active_rule:
+            if known:
+                self.events.append((KNOWN_FACT, name, args))
+            else:
+                self.events.append((NEW_FACT, name, args))
+                self.new_facts.add((name, args))
+        if known:
+            return
+        if rule is not None:
+            self.derivations[name, args] = (rule.name, tuple(
+                (premise, tuple(bindings[p.name] if isinstance(p, Var) else p for p in patterns))
+                for premise, patterns in rule.premises))
+        fact_list.add(args)
+        if fact_list is self.watched:
+            self._check_settled(args)
+        for rule, index in fact_list.rule_refs:
+            yield self._new_fact(rule, args, index)
@@ -0,0 +1,136 @@
+"""
+goal-directed evaluation of LP queries on top of ForwardChainingEngine
+
+a query `Pred(subject, $label)` only depends on the facts and rules a derivation of `Pred(subject, ...)`
+can use. relevant_slice finds them the way magic sets do: starting from the query goal, every rule with
+a conclusion that unifies with a goal is kept and its premises, with the constants the unification bound,
+become goals in turn; facts are kept when they match a goal. Forward chaining the slice derives the same
+query facts as the whole program (and the same Use / Bind / Obtain events for the rules it keeps), and
+GoalDirectedEngine stops as soon as every label the query could still get has been derived.
+"""
+from symbolic_solvers.pyke_solver.fc_engine import ForwardChainingEngine, Var
+
+FREE = object()  # an argument a goal leaves open
+
+
+class QuerySettled(Exception):
+    pass
+
+
+def _unify(patterns, goal_args):
+    """bindings of the pattern variables that make `patterns` match `goal_args`, None if they cannot"""
+    bindings = {}
+    for pattern, arg in zip(patterns, goal_args):
+        if isinstance(pattern, Var):
+            if arg is not FREE and bindings.setdefault(pattern.name, arg) != arg:
+                return None
+        elif arg is not FREE and pattern != arg:
+            return None
+    return bindings
+
+
+def _matches(args, goal_args):
+    return all(goal is FREE or arg == goal for arg, goal in zip(args, goal_args))
+
+
+def unbound_conclusions(rule):
+    """whether a conclusion of `rule` uses a variable none of its premises binds (an error when it fires)"""
+    bound = {p.name for _, patterns in rule.premises for p in patterns if isinstance(p, Var)}
+    return any(isinstance(p, Var) and p.name not in bound for _, patterns in rule.conclusions for p in patterns)
+
+
+def relevant_slice(facts, rules, goal):
+    """
+    Args:
+        facts: [(name, args)] as returned by fc_engine.convert_facts
+        rules: [fc_engine.Rule], in the order of the rule base
+        goal: (name, args) with FREE for the open arguments
+
+    Returns:
+        (facts, rules, goals): the facts matching a goal and the rules concluding one, both in their original
+        order, and the set of goals
+    """
+    by_conclusion = {}
+    for index, rule in enumerate(rules):
+        for name, _ in rule.conclusions:
+            by_conclusion.setdefault(name, []).append(index)
+    goals = {goal}
+    worklist = [goal]
+    kept = set()
+    while worklist:
+        name, goal_args = worklist.pop()
+        for index in by_conclusion.get(name, ()):
+            rule = rules[index]
+            for conclusion_name, patterns in rule.conclusions:
+                if conclusion_name != name or len(patterns) != len(goal_args):
+                    continue
+                bindings = _unify(patterns, goal_args)
+                if bindings is None:
+                    continue
+                kept.add(index)
+                for premise_name, premise_patterns in rule.premises:
+                    subgoal = (premise_name, tuple(bindings.get(p.name, FREE) if isinstance(p, Var) else p
+                                                   for p in premise_patterns))
+                    if subgoal not in goals:
+                        goals.add(subgoal)
+                        worklist.append(subgoal)
+
+    goals_by_name = {}
+    for name, goal_args in goals:
+        goals_by_name.setdefault(name, []).append(goal_args)
+    sliced_facts = [(name, args) for name, args in facts
+                    if any(len(args) == len(goal_args) and _matches(args, goal_args)
+                           for goal_args in goals_by_name.get(name, ()))]
+    return sliced_facts, [rules[index] for index in sorted(kept)], goals
+
+
+class GoalDirectedEngine(ForwardChainingEngine):
+    def __init__(self, facts, rules, name, subject, deadline=None):
+        """
+        forward chaining restricted to the slice of the program relevant to the query `name(subject, $label)`
+
+        Args:
+            facts, rules: the whole program, as for ForwardChainingEngine
+            name (str), subject: predicate and subject of the query
+        """
+        sliced_facts, sliced_rules, _ = relevant_slice(facts, rules, (name, (subject, FREE)))
+        super().__init__(sliced_facts, sliced_rules, deadline)
+        self.subject = subject
+        self.watched = self.get_fact_list(name)
+        self.found = {args[1] for args in self.watched.facts if len(args) == 2 and args[0] == subject}
+        # the labels the query can get, None when a rule concludes it with a variable label
+        self.candidates = set(self.found)
+        for rule in sliced_rules:
+            for conclusion_name, patterns in rule.conclusions:
+                if conclusion_name != name or len(patterns) != 2 or _unify(patterns, (subject, FREE)) is None:
+                    continue
+                if isinstance(patterns[1], Var):
+                    self.candidates = None
+                    break
+                self.candidates.add(patterns[1])
+            if self.candidates is None:
+                break
+        self.stopped_early = False
+        self.stats = {'rules': len(sliced_rules), 'total_rules': len(rules),
+                      'facts': sum(len(fact_list.facts) for fact_list in self.fact_lists.values()),
+                      'total_facts': len(set(facts))}
+
+    def activate(self):
+        if self._settled():
+            self.stopped_early = True
+        else:
+            try:
+                super().activate()
+            except QuerySettled:
+                self.stopped_early = True
+        self.stats['derived'] = sum(len(fact_list.facts) for fact_list in self.fact_lists.values()) - self.stats['facts']
+        self.stats['stopped_early'] = self.stopped_early
+
+    def _settled(self):
+        return self.candidates is not None and self.found >= self.candidates
+
+    def _check_settled(self, args):
+        if len(args) == 2 and args[0] == self.subject and args[1] not in self.found:
+            self.found.add(args[1])
+            if self._settled():
+                raise QuerySettled()
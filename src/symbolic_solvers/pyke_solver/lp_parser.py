@@ -0,0 +1,253 @@
+"""
+single-pass parser of the LP program format
+
+    Predicates:
+    Furry($x, bool) ::: Is x furry?
+    Facts:
+    Furry(Anne, True) ::: Anne is furry.
+    Rules:
+    Furry($x, True) && Nice($x, True) >>> Green($x, True) ::: Nice, furry things are green.
+    Query:
+    Green(Anne, True) ::: Anne is green.
+
+parse_program reads the lines once: a line starting with a section header opens that section (the rest of
+the line, if any, is its first statement), every other non-blank line is a statement of the open section,
+text before the first header is ignored. A statement is parsed into a Predicate, Atom (a fact), Rule or
+Query node keeping its `::: comment` and its line as written, and anything malformed raises LPSyntaxError
+with the line it is on. The trace lists the predicates and facts as the lines of their sections, as the
+solver always showed them: the section text without the whitespace around it, split on newlines.
+Atoms keep the text of their arguments, the native engine converts them to values (fc_engine.convert_atom)
+and the Pyke translation writes them back as they were written.
+"""
+import re
+from functools import lru_cache
+
+SECTION_HEADERS = ('Predicates:', 'Facts:', 'Rules:', 'Query:')
+
+_IDENTIFIER = re.compile(r'[a-zA-Z_][a-zA-Z0-9_]*')
+
+
+class LPSyntaxError(ValueError):
+    def __init__(self, message, lineno=None, line=None):
+        self.lineno = lineno  # 1-based line of the program, None when parsing a single statement
+        if line is not None:
+            message = f'{message}: {line.strip()!r}'
+        if lineno is not None:
+            message = f'line {lineno}: {message}'
+        super().__init__(message)
+
+
+class Atom:
+    """`Name(arg, ...)`, a fact (with the comment of its line) or a premise / conclusion of a rule"""
+    __slots__ = ('name', 'args', 'text', 'comment', 'line', 'lineno')
+
+    def __init__(self, name, args, text, comment=None, line=None, lineno=None):
+        self.name = name
+        self.args = args          # (str), the stripped text of each argument
+        self.text = text          # the atom as written, stripped
+        self.comment = comment    # text after `:::`, None if there is none (always None inside rules)
+        self.line = line          # the statement with its comment as written (see parse_program), for the trace
+        self.lineno = lineno
+
+    def __repr__(self):
+        return f'Atom({self.text!r})'
+
+
+class Predicate:
+    """`Name($x, ..., bool)` of the Predicates section"""
+    __slots__ = ('name', 'args', 'comment', 'line', 'lineno')
+
+    def __init__(self, name, args, comment, line, lineno=None):
+        self.name = name
+        self.args = args
+        self.comment = comment
+        self.line = line
+        self.lineno = lineno
+
+    def __repr__(self):
+        return f'Predicate({self.line!r})'
+
+
+class Rule:
+    """`Premise && ... >>> Conclusion && ...`"""
+    __slots__ = ('premises', 'conclusions', 'text', 'comment', 'line', 'lineno')
+
+    def __init__(self, premises, conclusions, text, comment, line, lineno=None):
+        self.premises = premises        # [Atom]
+        self.conclusions = conclusions  # [Atom]
+        self.text = text                # the rule without its comment, as shown in `Use ruleN: ...`
+        self.comment = comment
+        self.line = line
+        self.lineno = lineno
+
+    def __repr__(self):
+        return f'Rule({self.text!r})'
+
+
+class Query:
+    """
+    `Pred(subject, True|False)`; the subject is looked up as `Pred(subject, $label)` and the last argument
+    only counts for two-argument queries (longer ones check for False), as the solver always read them
+    """
+    __slots__ = ('atom', 'comment', 'line', 'lineno')
+
+    def __init__(self, atom, comment, line, lineno=None):
+        self.atom = atom
+        self.comment = comment
+        self.line = line
+        self.lineno = lineno
+
+    @property
+    def predicate(self):
+        return self.atom.name
+
+    @property
+    def subject(self):
+        return self.atom.args[0]
+
+    @property
+    def value(self):
+        return len(self.atom.args) == 2 and self.atom.args[1] == 'True'
+
+    def __repr__(self):
+        return f'Query({self.atom.text!r})'
+
+
+class LogicProgram:
+    __slots__ = ('predicates', 'facts', 'rules', 'queries', 'listings')
+
+    def __init__(self, predicates, facts, rules, queries, listings=None):
+        self.predicates = predicates  # [Predicate]
+        self.facts = facts            # [Atom]
+        self.rules = rules            # [Rule], rule{i + 1} is rules[i]
+        self.queries = queries        # [Query], at least one
+        self.listings = listings or {}  # section header -> its lines as the trace lists them, blank ones included
+
+    def listing(self, header):
+        """the lines the trace lists for the 'Predicates:' or 'Facts:' section"""
+        if header in self.listings:
+            return self.listings[header]
+        return [node.line for node in (self.predicates if header == 'Predicates:' else self.facts)]
+
+
+def _split_comment(line):
+    text, sep, comment = line.partition(':::')
+    return text.strip(), comment.strip() if sep else None
+
+
+@lru_cache(maxsize=65536)
+def _split_atom(text):
+    """(name, args, None) for `Name(arg, ...)`, (None, None, what is wrong) otherwise"""
+    # the same premises and conclusions come back in many rules
+    open_paren = text.find('(')
+    if open_paren <= 0 or not text.endswith(')'):
+        return None, None, f"expected 'Name(arg, ...)', found {text!r}"
+    name = text[:open_paren].rstrip()
+    inner = text[open_paren + 1:-1]
+    if not _IDENTIFIER.fullmatch(name):
+        return None, None, f'invalid name {name!r}'
+    if '(' in inner or ')' in inner:
+        return None, None, f'unbalanced parentheses in {text!r}'
+    args = tuple([arg.strip() for arg in inner.split(',')])
+    if not all(args):
+        return None, None, f'empty argument in {text!r}'
+    return name, args, None
+
+
+def _atom(text, lineno, line):
+    name, args, error = _split_atom(text)
+    if error is not None:
+        raise LPSyntaxError(error, lineno, line)
+    return Atom(name, args, text)
+
+
+def parse_predicate(line, lineno=None):
+    text, comment = _split_comment(line)
+    atom = _atom(text, lineno, line)
+    return Predicate(atom.name, atom.args, comment, line, lineno)
+
+
+def parse_fact(line, lineno=None):
+    text, comment = _split_comment(line)
+    if '>>>' in text:
+        raise LPSyntaxError('expected a fact, found a rule', lineno, line)
+    atom = _atom(text, lineno, line)
+    atom.comment, atom.line, atom.lineno = comment, line, lineno
+    return atom
+
+
+def parse_rule(line, lineno=None):
+    text, comment = _split_comment(line)
+    sides = text.split('>>>')
+    if len(sides) != 2:
+        raise LPSyntaxError("expected one '>>>' in a rule", lineno, line)
+    premises = [_atom(part.strip(), lineno, line) for part in sides[0].split('&&')]
+    conclusions = [_atom(part.strip(), lineno, line) for part in sides[1].split('&&')]
+    return Rule(premises, conclusions, text, comment, line, lineno)
+
+
+def parse_query(line, lineno=None):
+    text, comment = _split_comment(line)
+    atom = _atom(text, lineno, line)
+    if len(atom.args) < 2:
+        raise LPSyntaxError("expected 'Pred(subject, True|False)'", lineno, line)
+    return Query(atom, comment, line, lineno)
+
+
+def parse_program(program):
+    """
+    Args:
+        program (str): the LP program
+
+    Returns:
+        LogicProgram
+
+    the Query section is required, and at least one of Facts / Rules; when only one of them has
+    statements, lines with `>>>` in it are the rules and the others the facts
+    """
+    sections = {}  # header -> [(lineno, line)]
+    texts = {}  # header -> every line of the section, blank ones included
+    current = None
+    for lineno, line in enumerate(program.split('\n'), 1):
+        stripped = line.lstrip()
+        for header in SECTION_HEADERS:
+            if stripped.startswith(header):
+                if header in sections:
+                    raise LPSyntaxError(f'duplicate {header[:-1]} section', lineno, line)
+                current = sections[header] = []
+                current_text = texts[header] = []
+                line = stripped[len(header):]
+                break
+        if current is not None:
+            current_text.append(line)
+            if line.strip():
+                current.append((lineno, line))
+    listings = {}
+    for header, statements in sections.items():
+        # a line is kept as written, but the first and last ones of a section lose the whitespace around it
+        if statements:
+            statements[0] = (statements[0][0], statements[0][1].lstrip())
+            statements[-1] = (statements[-1][0], statements[-1][1].rstrip())
+        listings[header] = '\n'.join(texts[header]).strip().split('\n')
+
+    if 'Query:' not in sections:
+        raise LPSyntaxError('no Query section')
+    if not sections['Query:']:
+        raise LPSyntaxError('empty Query section')
+    if 'Facts:' not in sections and 'Rules:' not in sections:
+        raise LPSyntaxError('no Facts or Rules section')
+    fact_lines, rule_lines = sections.get('Facts:', []), sections.get('Rules:', [])
+    if not fact_lines or not rule_lines:
+        statements = fact_lines + rule_lines
+        is_rule = ['>>>' in line.partition(':::')[0] for _, line in statements]
+        fact_lines = [statement for statement, rule in zip(statements, is_rule) if not rule]
+        rule_lines = [statement for statement, rule in zip(statements, is_rule) if rule]
+        if fact_lines != sections.get('Facts:', []):
+            listings.pop('Facts:', None)  # the facts are not the lines of the Facts section
+
+    return LogicProgram(
+        [parse_predicate(line, lineno) for lineno, line in sections.get('Predicates:', [])],
+        [parse_fact(line, lineno) for lineno, line in fact_lines],
+        [parse_rule(line, lineno) for lineno, line in rule_lines],
+        [parse_query(line, lineno) for lineno, line in sections['Query:']],
+        listings)
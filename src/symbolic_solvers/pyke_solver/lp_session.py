@@ -0,0 +1,92 @@
+"""
+incremental evaluation of an LP theory that grows step by step
+
+Pyke_Program evaluates a whole program from its text. LPSession keeps a ForwardChainingEngine alive
+instead: facts added to it only fire the rules whose premises they match, with the new fact bound (the
+semi-naive delta Pyke's forward chaining is built on), and a rule added to it is run once on the current
+facts. Each step therefore costs what the change derives rather than the size of the theory, and its trace
+only covers the new derivations. The closure after any sequence of steps is the one of the whole program.
+Statements are parsed with lp_parser, a malformed one raises LPSyntaxError and changes nothing.
+
+    session = LPSession('ProofWriter')
+    session.add_rules(['Furry($x, True) >>> Nice($x, True) ::: All furry things are nice.'])
+    session.add_facts(['Furry(Anne, True) ::: Anne is furry.'])
+    session.query('Nice(Anne, True)')  # 'A'
+"""
+from symbolic_solvers.pyke_solver.fc_engine import (ForwardChainingEngine, UnsupportedProgram, convert_facts, convert_rule,
+                                                    parse_data)
+from symbolic_solvers.pyke_solver.goal_directed import unbound_conclusions
+from symbolic_solvers.pyke_solver.lp_parser import parse_fact, parse_query, parse_rule
+from symbolic_solvers.pyke_solver.pyke_solver import Pyke_Program
+from symbolic_solvers.pyke_solver.trace_events import render_events, render_new_facts
+
+
+class LPSession:
+    def __init__(self, dataset_name='ProofWriter'):
+        """
+        Args:
+            dataset_name (str): 'ProntoQA' or 'ProofWriter', selects the answer mapping of query
+        """
+        if dataset_name not in ('ProntoQA', 'ProofWriter'):
+            raise ValueError(f'unsupported dataset: {dataset_name}')
+        self.dataset_name = dataset_name
+        self.engine = ForwardChainingEngine([], [])
+        self.engine.activate()
+        self.rule_map = {}  # rule name -> rule text, for the trace
+        self.reasoning_process = []  # trace of the last step
+
+    def add_facts(self, facts):
+        """
+        Args:
+            facts: LP fact lines, `Pred(args, True|False)` optionally followed by `::: text`
+
+        Returns:
+            list: the trace of the derivations the facts caused, as Pyke_Program.reasoning_process
+        """
+        return self._step(self.engine.add_facts, convert_facts([parse_fact(fact) for fact in facts]))
+
+    def add_rules(self, rules):
+        """
+        Args:
+            rules: LP rule lines, `Premise && ... >>> Conclusion && ...` optionally followed by `::: text`,
+                numbered after the rules already in the session
+
+        Returns:
+            list: the trace of the derivations the rules caused, as Pyke_Program.reasoning_process
+        """
+        parsed = [parse_rule(rule) for rule in rules]
+        names = [f'rule{len(self.rule_map) + idx + 1}' for idx in range(len(parsed))]
+        converted = [convert_rule(name, rule) for name, rule in zip(names, parsed)]
+        for rule, native in zip(parsed, converted):
+            # it would fail halfway through the step and leave the closure incomplete
+            if unbound_conclusions(native):
+                raise UnsupportedProgram(f'conclusion variable bound by no premise: {rule.text}')
+        self.rule_map.update((name, rule.text) for name, rule in zip(names, parsed))
+        return self._step(self.engine.add_rules, converted)
+
+    def query(self, query):
+        """
+        Args:
+            query (str): `Pred(subject, True|False)` as in the Query section of a program, optionally followed
+                by `::: text`
+
+        Returns:
+            str: the answer on the current closure, mapped as Pyke_Program does for the dataset
+        """
+        query = parse_query(query)
+        result = Pyke_Program.combine_results(self.engine.labels(query.predicate, parse_data(query.subject)))
+        if self.dataset_name == 'ProntoQA':
+            return Pyke_Program.answer_map_prontoqa(result, query.value)
+        return Pyke_Program.answer_map_proofwriter(result, query.value)
+
+    def facts(self):
+        """the current closure, {(name, args)}"""
+        return {(fact_list.name, args) for fact_list in self.engine.fact_lists.values() for args in fact_list.facts}
+
+    def _step(self, apply, items):
+        engine = self.engine
+        # each step has a trace of its own, rules it uses first are shown with their text
+        engine.events, engine.new_facts, engine.used = [], set(), set()
+        apply(items)
+        self.reasoning_process = render_events(engine.events, self.rule_map) + [render_new_facts(engine.new_facts)]
+        return self.reasoning_process
@@ -0,0 +1,63 @@
+"""
+minimal proofs read from the derivation DAG of a forward chaining run
+
+every engine keeps, for each implied fact, the rule and the premise facts of its first derivation:
+`derivations[(name, args)] = (rule name, ((premise name, premise args), ...))`. The premises were known when
+the rule fired, so the facts and their first derivations form a DAG whose sources are the facts of the
+program, and the dict is filled in derivation order, a topological order of it.
+
+The full trace shows every rule application of the run, most of them unrelated to the query. The proof of
+a fact keeps the derivations it depends on only, each implied fact once, in derivation order:
+
+    Apply rule3 to Young('Harry', True): obtain Furry('Harry', True)
+    Apply rule5 to Furry('Harry', True), Nice('Harry', True): obtain Green('Harry', True)
+"""
+from symbolic_solvers.pyke_solver.trace_events import format_fact
+
+
+def support(derivations, goals):
+    """
+    Args:
+        derivations (dict): (name, args) -> (rule name, premise facts), in derivation order
+        goals: [(name, args)], the facts to prove
+
+    Returns:
+        list: the implied facts the goals depend on (themselves included), in derivation order
+    """
+    needed = set()
+    stack = [goal for goal in goals if goal in derivations]
+    while stack:
+        fact = stack.pop()
+        if fact in needed:
+            continue
+        needed.add(fact)
+        stack.extend(premise for premise in derivations[fact][1] if premise in derivations)
+    return [fact for fact in derivations if fact in needed]
+
+
+def render_step(fact, derivation):
+    rule, premises = derivation
+    return (f"Apply {rule} to " + ', '.join(format_fact(name, args) for name, args in premises)
+            + f": obtain {format_fact(*fact)}")
+
+
+def render_proof(derivations, facts):
+    """
+    Args:
+        derivations (dict): as in support
+        facts: the implied facts to show, in derivation order
+
+    Returns:
+        list: one `Apply ruleN to ...: obtain ...` line per fact
+    """
+    return [render_step(fact, derivations[fact]) for fact in facts]
+
+
+def premises_used(derivations, facts):
+    """the facts of the program the derivations of `facts` start from, {(name, args)}"""
+    return {premise for fact in facts for premise in derivations[fact][1] if premise not in derivations}
+
+
+def rules_used(derivations, facts):
+    """the names of the rules the derivations of `facts` apply, {rule name}"""
+    return {derivations[fact][0] for fact in facts}
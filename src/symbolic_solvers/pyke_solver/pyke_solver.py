@@ -1,36 +1,116 @@
+import hashlib
+import importlib
 import os
+import shutil
 import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
 # 添加项目根目录到 Python 路径
 project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-from pyke import knowledge_engine
-import re
-from symbolic_solvers.pyke_solver.pyke_trace import patch_pyke, unpatch_pyke, tracer
+from symbolic_solvers.pyke_solver.bitset_engine import UnaryBitsetEngine, UnaryTheory
+from symbolic_solvers.pyke_solver.fc_engine import (KRB_KEYWORDS, ForwardChainingEngine, UnsupportedProgram, Var,
+                                                    convert_atom, convert_facts, convert_rule, parse_data)
+from symbolic_solvers.pyke_solver.goal_directed import GoalDirectedEngine, unbound_conclusions
+from symbolic_solvers.pyke_solver.lp_parser import LPSyntaxError, parse_program
+from symbolic_solvers.pyke_solver.proof_dag import premises_used, render_proof, rules_used, support
+from symbolic_solvers.pyke_solver.trace_events import format_fact, render_events, render_new_facts
+
+# compiled Pyke engines of this process by hash of their sources (rules.krb, plus facts.kfb for facts that
+# cannot be asserted in memory), least recently used first; programs sharing a rule base compile it once.
+# An engine is taken out while a program runs on it, concurrent programs with the same rule base compile
+# another one
+MAX_COMPILED_ENGINES = 64
+_compiled_engines = OrderedDict()
+_engines_lock = threading.Lock()
+# Pyke's compiler and goal parser share PLY parsers, which are not thread safe
+_compile_lock = threading.Lock()
+
+
+def _reset_pyke_scanner():
+    """
+    put Pyke's lexer back in its initial state, call with _compile_lock held: it is module level and a
+    syntax error leaves it in the state it failed in, failing the next compile (`illegal character ...`)
+    """
+    from pyke.krb_compiler import scanner
+    if scanner.lexer is not None:
+        scanner.lexer.begin('INITIAL')
+
+
+def _checkout_engine(key):
+    with _engines_lock:
+        return _compiled_engines.pop(key, None)
+
+
+def _checkin_engine(key, engine):
+    with _engines_lock:
+        _compiled_engines[key] = engine
+        while len(_compiled_engines) > MAX_COMPILED_ENGINES:
+            _compiled_engines.popitem(last=False)
+
 
 class Pyke_Program:
-    def __init__(self, logic_program: str, dataset_name='ProntoQA') -> None:
+    def __init__(self, logic_program: str, dataset_name='ProntoQA', cache_tag=None, timeout=None,
+                 backend='native', trace=True, proof=None) -> None:
         """
         Args:
             logic_program (str): SL, including Predicates, Facts, Rules, Query
             dataset_name (str): dataset name, support 'ProntoQA' and 'ProofWriter'
+            cache_tag (str): optional suffix for the cache directory and compiled_krb package names of this
+                process (each compile works in a fresh workspace inside them, see compile_rule_base)
+            timeout (float): optional time budget in seconds for parsing and executing, None for no limit
+            backend (str): 'native' for the in-process ForwardChainingEngine, 'pyke' to compile the program
+                with Pyke; programs outside the syntax the native engine accepts always go to Pyke.
+                'bitset' evaluates unary theories with UnaryBitsetEngine (same answers, trace in fixpoint
+                order) and uses the native engine for all other programs. 'goal' runs the native engine on the
+                part of the program relevant to the query only and stops once its answer is settled (same
+                answers, the trace only covers the rules that were needed; goal_stats tells how much of
+                the program was evaluated. It is set on the program object only, result records and so
+                cached results do not carry it)
+            trace (bool): False for answer-only runs, execute_program then returns no reasoning and runs
+                Pyke without a tracer (its time budget is then only checked before it starts)
+            proof (str): None for the full trace as reasoning, 'query' for the proof of the query facts only
+                and 'closure' for the proof of every implied fact, each derived once (see proof_dag)
         """
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.timings = {}  # seconds spent per stage
         self.logic_program = logic_program
-        self.flag = self.parse_logic_program()  # parse SL, return whether success
+        start = time.perf_counter()
+        self.flag = self.parse_logic_program()  # parse SL, return whether success (parse_error tells why not)
+        self.timings['parse'] = time.perf_counter() - start
         self.dataset_name = dataset_name
-        
-        cache_dir = os.path.join(os.path.dirname(__file__), '.cache_program')
-        if not os.path.exists(cache_dir):
-            os.makedirs(cache_dir)
-        self.cache_dir = cache_dir
-
-        try:
-            self.create_fact_file(self.Facts)
-            self.create_rule_file(self.Rules)
-            self.flag = True
-        except:
-            self.flag = False
+        self.backend = backend
+        self.trace = trace
+        self.proof = proof
+        self.query_labels = []  # values of $label found for the query, set by check_specific_predicate
+
+        suffix = f'_{cache_tag}' if cache_tag else ''
+        self.cache_dir = os.path.join(os.path.dirname(__file__), '.cache_program' + suffix)
+        self.compiled_pkg = '.compiled_krb' + suffix
+
+        if self.flag:
+            start = time.perf_counter()
+            if self.backend in ('native', 'bitset', 'goal'):
+                try:
+                    self.compile_native(self.program)
+                except UnsupportedProgram:
+                    self.backend = 'pyke'
+            if self.backend == 'bitset':
+                try:
+                    self.unary_theory = UnaryTheory(self.native_facts, self.native_rules)
+                except UnsupportedProgram:
+                    self.backend = 'native'
+            if self.backend == 'goal' and any(unbound_conclusions(rule) for rule in self.native_rules):
+                # a rule that fails when it fires has to be evaluated even if the query does not need it,
+                # as the whole program would be
+                self.backend = 'native'
+            if self.backend == 'pyke':
+                self.prepare_pyke_sources(self.program)
+            self.timings['translate' if self.backend == 'pyke' else 'compile'] = time.perf_counter() - start
 
         # answer mapping function for different datasets
         self.answer_map = {'ProntoQA': self.answer_map_prontoqa, 
@@ -38,7 +118,7 @@ class Pyke_Program:
 
     def parse_logic_program(self):
         """
-        parse SL, extract each component
+        parse SL into self.program (see lp_parser), the query asked is the first one
         
         SL format example:
         Predicates: ... 
@@ -47,108 +127,115 @@ class Pyke_Program:
         Query: ... 
         
         Returns:
-            bool: 解析是否成功
-        """
-        keywords = ['Query:', 'Rules:', 'Facts:', 'Predicates:']
-        program_str = self.logic_program
-
-        for keyword in keywords:
-            try:
-                program_str, segment_list = self._parse_segment(program_str, keyword)
-                cleaned = [line.split(':::')[0].strip() for line in segment_list]
-                setattr(self, keyword[:-1], cleaned)
-                setattr(self, keyword[:-1] + '_full', segment_list)
-            except:
-                setattr(self, keyword[:-1], None)
-                setattr(self, keyword[:-1] + '_full', None)
-
-        return self.validate_program()
-
-    def _parse_segment(self, program_str, key_phrase):
+            bool: 解析是否成功, self.parse_error holds the LPSyntaxError message otherwise
         """
-        parse specific segment in program
-        
-        Args:
-            program_str (str): program string
-            key_phrase (str): key phrase (e.g., 'Facts:')
-            
-        Returns:
-            tuple: (remaining program string, parsed segment list)
-        """
-        remain_program_str, segment = program_str.split(key_phrase)
-        segment_list = segment.strip().split('\n')
-        return remain_program_str, segment_list
-
-    def validate_program(self):
-        if not self.Rules is None and not self.Facts is None:
-            if not self.Rules[0] == '' and not self.Facts[0] == '':
-                return True
-                
-        tmp_rules = []
-        tmp_facts = []
-        statements = self.Facts if self.Facts is not None else self.Rules
-        if statements is None:
+        try:
+            self.program = parse_program(self.logic_program)
+        except LPSyntaxError as e:
+            self.program = None
+            self.parse_error = str(e)
             return False
-        
-        for fact in statements:
-            if fact.find('>>>') >= 0:
-                tmp_rules.append(fact)
-            else:
-                tmp_facts.append(fact)
-        self.Rules = tmp_rules
-        self.Facts = tmp_facts
-        return False
-    
+        self.query = self.program.queries[0]
+        return True
+
+    @staticmethod
+    def ground_facts(program):
+        # 过滤掉包含变量$x的无效事实
+        return [fact for fact in program.facts if not fact.text.find('$x') >= 0]
+
     def create_fact_file(self, facts):
-        with open(os.path.join(self.cache_dir, 'facts.kfb'), 'w') as f:
+        with open(os.path.join(self.workspace, 'facts.kfb'), 'w') as f:
             for fact in facts:
-                # 过滤掉包含变量$x的无效事实
-                if not fact.find('$x') >= 0:
-                    f.write(fact + '\n')
+                f.write(fact.text + '\n')
 
     def create_rule_file(self, rules):
+        with open(os.path.join(self.workspace, 'rules.krb'), 'w') as f:
+            f.write(self.krb_source(rules))
+
+    def krb_source(self, rules):
         pyke_rules = []
         for idx, rule in enumerate(rules):
             pyke_rules.append(self.parse_forward_rule(idx + 1, rule))
+        return '\n\n'.join(pyke_rules)
 
-        with open(os.path.join(self.cache_dir, 'rules.krb'), 'w') as f:
-            f.write('\n\n'.join(pyke_rules))
+    def prepare_pyke_sources(self, program):
+        """
+        key the compiled rule base by its source; facts are asserted into the engine in memory when they
+        convert, otherwise facts.kfb is compiled along with the rules (and part of the key)
+        """
+        source = self.krb_source(program.rules)
+        facts = self.ground_facts(program)
+        try:
+            self.pyke_facts = convert_facts(facts)
+        except UnsupportedProgram:
+            self.pyke_facts = None
+            source += '\0' + '\n'.join(fact.text for fact in facts)
+        self.rule_base_key = hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+    def compile_rule_base(self):
+        """
+        write the sources to a workspace of this instance and have Pyke compile them into a package named
+        after it, so that concurrent programs (threads or processes) never read each other's theory;
+        both are removed once the engine is loaded, the engine keeps the modules it imported
+        """
+        from pyke import knowledge_engine
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.workspace = tempfile.mkdtemp(prefix='ws_', dir=self.cache_dir)
+        compiled_pkg = f'{self.compiled_pkg}_{os.path.basename(self.workspace)}'
+        # pyke places the compiled package next to the source root on sys.path (i.e. src/)
+        compiled_krb_dir = os.path.join(project_root, compiled_pkg.lstrip('.'))
+        try:
+            self.create_rule_file(self.program.rules)
+            if self.pyke_facts is None:
+                self.create_fact_file(self.ground_facts(self.program))
+            with _compile_lock:
+                _reset_pyke_scanner()
+                importlib.invalidate_caches()  # the compiled package is a new directory
+                return knowledge_engine.engine((self.workspace, compiled_pkg))
+        finally:
+            shutil.rmtree(self.workspace, ignore_errors=True)
+            shutil.rmtree(compiled_krb_dir, ignore_errors=True)
+            pkg_name = compiled_pkg.lstrip('.')
+            for name in [m for m in list(sys.modules) if m == pkg_name or m.startswith(pkg_name + '.')]:
+                del sys.modules[name]
+
+    def compile_native(self, program):
+        """
+        convert the parsed program for the native engine, raising UnsupportedProgram when Pyke has to handle
+        it (constants or a query subject, such as a $variable, that Pyke reads differently)
+        """
+        self.native_facts = convert_facts(self.ground_facts(program))
+        self.native_rules = [convert_rule(f'rule{idx + 1}', rule) for idx, rule in enumerate(program.rules)]
+        _, (subject, _) = convert_atom(self.query.predicate, (self.query.subject, '$label'), KRB_KEYWORDS,
+                                       allow_vars=True)
+        if isinstance(subject, Var):
+            raise UnsupportedProgram('variable as query subject')
+        self.native_query = (self.query.predicate, subject)
 
     def parse_forward_rule(self, f_index, rule):
         """
-        parse forward reasoning rule, convert to Pyke format
+        convert a parsed forward reasoning rule to Pyke format
         
         example rule: Furry($x, True) && Quite($x, True) >>> White($x, True)
         convert to Pyke's foreach-assert format
 
         Args:
             f_index (int): rule index
-            rule (str): original rule string
+            rule (lp_parser.Rule): the rule
             
         Returns:
             str: Pyke format rule
         """
-        premise, conclusion = rule.split('>>>')
-        premise = premise.strip()
-        
-        # 将前提条件按'&&'分割成多个条件
-        premise = premise.split('&&')
-        premise_list = [p.strip() for p in premise]
-
-        conclusion = conclusion.strip()
-        # 将结论按'&&'分割成多个结论
-        conclusion = conclusion.split('&&')
-        conclusion_list = [c.strip() for c in conclusion]
-
         # 创建Pyke规则格式
         pyke_rule = f'''rule{f_index}\n\tforeach'''
         # 添加前提条件
-        for p in premise_list:
-            pyke_rule += f'''\n\t\tfacts.{p}'''
+        for p in rule.premises:
+            pyke_rule += f'''\n\t\tfacts.{p.text}'''
         pyke_rule += f'''\n\tassert'''
         # 添加结论
-        for c in conclusion_list:
-            pyke_rule += f'''\n\t\tfacts.{c}'''
+        for c in rule.conclusions:
+            pyke_rule += f'''\n\t\tfacts.{c.text}'''
         return pyke_rule
     
     def check_specific_predicate(self, subject_name, predicate_name, engine):
@@ -166,18 +253,36 @@ class Pyke_Program:
         Returns:
             reasoning result (True/False/None)
         """
+        if isinstance(engine, (ForwardChainingEngine, UnaryBitsetEngine)):
+            results = engine.labels(predicate_name, parse_data(subject_name))
+            self.query_labels = results
+            return self.combine_results(results)
+
+        from pyke import goal
+
         results = []
         
         # 在事实库中查找
-        with engine.prove_goal(f'facts.{predicate_name}({subject_name}, $label)') as gen:
+        # (engine.prove_goal, with the goal parsed under the lock, Pyke's goal parser is shared with its compiler)
+        with _compile_lock:
+            _reset_pyke_scanner()
+            fact_goal = goal.compile(f'facts.{predicate_name}({subject_name}, $label)')
+        with fact_goal.prove(engine) as gen:
             for vars, plan in gen:
                 results.append(vars['label'])
 
         # 在规则库中查找
-        with engine.prove_goal(f'rules.{predicate_name}({subject_name}, $label)') as gen:
+        with _compile_lock:
+            _reset_pyke_scanner()
+            rule_goal = goal.compile(f'rules.{predicate_name}({subject_name}, $label)')
+        with rule_goal.prove(engine) as gen:
             for vars, plan in gen:
                 results.append(vars['label'])
+        self.query_labels = results
+        return self.combine_results(results)
 
+    @staticmethod
+    def combine_results(results):
         # 处理结果
         if len(results) == 1:
             return results[0]
@@ -186,29 +291,6 @@ class Pyke_Program:
         elif len(results) == 0:
             return None
 
-    def parse_query(self, query):
-        """
-        解析查询语句
-        
-        输入示例: Metallic(Wren, False)
-        
-        Args:
-            query (str): 查询字符串
-            
-        Returns:
-            tuple: (函数名, 参数1, 参数2的布尔值)
-        """
-        pattern = r'(\w+)\(([^,]+),\s*([^)]+)\)'
-        match = re.match(pattern, query)
-        if match:
-            function_name = match.group(1)
-            arg1 = match.group(2)
-            arg2 = match.group(3)
-            arg2 = True if arg2 == 'True' else False
-            return function_name, arg1, arg2
-        else:
-            raise ValueError(f'Invalid query: {query}')
-
     def execute_program_wo_reasoning(self):
         """
         执行逻辑程序，进行推理
@@ -216,35 +298,85 @@ class Pyke_Program:
         Returns:
             tuple: (答案, 错误信息)
         """
-        # 删除编译的krb目录，避免缓存问题
-        compiled_krb_dir = os.path.join(os.path.dirname(__file__), 'compiled_krb')
-        if os.path.exists(compiled_krb_dir):
-            print('removing compiled_krb')
-            os.system(f'rm -rf {compiled_krb_dir}/*')
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return None, 'time budget exhausted'
 
+        engine = None
         try:
-            # 初始化Pyke推理引擎
-            engine = knowledge_engine.engine(self.cache_dir)
-            engine.reset()
+            # 初始化Pyke推理引擎, reusing the one compiled for the same rule base
+            start = time.perf_counter()
+            engine = _checkout_engine(self.rule_base_key)
+            if engine is not None:
+                self.timings['krb_cache_hit'] = time.perf_counter() - start
+            else:
+                engine = self.compile_rule_base()
+                self.timings['krb_compile'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            engine.reset()  # drops the facts of the previous program that used this engine
+            for name, args in self.pyke_facts or ():
+                engine.add_case_specific_fact('facts', name, args)
             engine.activate('rules')  # 激活规则
             engine.get_kb('facts')    # 加载事实
+            self.timings['forward_chaining'] = time.perf_counter() - start
 
             # 解析查询并执行推理
-            predicate, subject, value_to_check = self.parse_query(self.Query[0])
+            start = time.perf_counter()
+            predicate, subject, value_to_check = self.query.predicate, self.query.subject, self.query.value
             result = self.check_specific_predicate(subject, predicate, engine)
+            self.timings['query'] = time.perf_counter() - start
             
             # 根据数据集类型映射答案
             answer = self.answer_map[self.dataset_name](result, value_to_check)
         except Exception as e:
             return None, e
+        finally:
+            if engine is not None:
+                _checkin_engine(self.rule_base_key, engine)
         
         return answer, ""
 
+    def execute_native(self):
+        """
+        same as execute_program_wo_reasoning on the native (bitset, goal-directed) engine
+
+        Returns:
+            tuple: (答案, 错误信息, engine holding the trace, None if it was not run)
+        """
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return None, 'time budget exhausted', None
+
+        if self.backend == 'bitset':
+            engine = UnaryBitsetEngine(self.unary_theory, self.deadline)
+        elif self.backend == 'goal':
+            start = time.perf_counter()
+            engine = GoalDirectedEngine(self.native_facts, self.native_rules, *self.native_query, self.deadline)
+            self.timings['goal_slice'] = time.perf_counter() - start
+        else:
+            engine = ForwardChainingEngine(self.native_facts, self.native_rules, self.deadline)
+        try:
+            start = time.perf_counter()
+            engine.activate()
+            self.timings['forward_chaining'] = time.perf_counter() - start
+            if self.backend == 'goal':
+                self.goal_stats = engine.stats
+
+            start = time.perf_counter()
+            predicate, subject, value_to_check = self.query.predicate, self.query.subject, self.query.value
+            result = self.check_specific_predicate(subject, predicate, engine)
+            self.timings['query'] = time.perf_counter() - start
+
+            answer = self.answer_map[self.dataset_name](result, value_to_check)
+        except Exception as e:
+            return None, e, engine
+        return answer, "", engine
+
     def answer_mapping(self, answer):
         """答案映射函数（基础版本）"""
         return answer
         
-    def answer_map_prontoqa(self, result, value_to_check):
+    @staticmethod
+    def answer_map_prontoqa(result, value_to_check):
         """
         ProntoQA数据集的答案映射
         
@@ -260,7 +392,8 @@ class Pyke_Program:
         else:
             return 'B'
 
-    def answer_map_proofwriter(self, result, value_to_check):
+    @staticmethod
+    def answer_map_proofwriter(result, value_to_check):
         """
         ProofWriter数据集的答案映射
         
@@ -282,32 +415,99 @@ class Pyke_Program:
     # Functions for revealing solver reasoning process using Pyke tracing
 
     def execute_program(self):
-        rule_map = {f"rule{i+1}": r.split(':::')[0].strip() for i, r in enumerate(self.Rules_full)}
-        patch_pyke(rule_map)
-        answer, msg = self.execute_program_wo_reasoning()
-        reasoning = tracer.events
-        if tracer.new_facts:
-            reasoning.append("All newly implied Facts: " + ', '.join(sorted(tracer.new_facts)))
+        if self.backend != 'pyke':
+            answer, msg, engine = self.execute_native()
+            events = engine.events if engine is not None else []
+            new_facts = engine.new_facts if engine is not None else set()
+            derivations = engine.derivations if engine is not None else {}
+        elif not self.trace:
+            answer, msg = self.execute_program_wo_reasoning()
+        else:
+            from symbolic_solvers.pyke_solver.pyke_trace import tracing
+            # the trace of this run only, other threads running Pyke at the same time record their own
+            with tracing(deadline=self.deadline) as tracer:
+                answer, msg = self.execute_program_wo_reasoning()
+            events, new_facts, derivations = tracer.events, tracer.new_facts, tracer.derivations
+        if not self.trace:
+            return answer, msg, ''
+        start = time.perf_counter()
+        if self.proof is not None:
+            reasoning_string = self.build_proof_string(derivations)
         else:
-            reasoning.append("All newly implied Facts: None")
-        self.reasoning_process = reasoning
-        unpatch_pyke()
-        return answer, msg, self.build_reasoning_string(reasoning)
+            reasoning_string = self.build_reasoning_string(events, new_facts)
+        self.timings['reasoning_build'] = time.perf_counter() - start
+        return answer, msg, reasoning_string
 
-    def build_reasoning_string(self, reasoning):
+    def build_reasoning_string(self, events, new_facts):
+        """
+        events: the trace events recorded while running (see trace_events), new_facts: {(name, args)}
+        """
+        rules = self.program.rules
+        rule_map = {f"rule{i+1}": r.text for i, r in enumerate(rules)}
+        self.reasoning_process = render_events(events, rule_map) + [render_new_facts(new_facts)]
         lines = []
         lines.append("We first define following predicates and corresponding natural language explanations:")
-        for p in self.Predicates_full:
-            lines.append(f"  {p}")
+        for line in self.program.listing('Predicates:'):
+            lines.append(f"  {line}")
         lines.append("We have following known facts from the context:")
-        for f in self.Facts_full:
-            lines.append(f"  {f}")
+        for line in self.program.listing('Facts:'):
+            lines.append(f"  {line}")
         lines.append("We have following known rules from the context:")
-        for i, r in enumerate(self.Rules_full):
-            rule_txt = r.split(':::')[0].strip()
-            lines.append(f"  rule{i+1}: {rule_txt}")
+        for i, r in enumerate(rules):
+            lines.append(f"  rule{i+1}: {r.text}")
         lines.append("Now begin reasoning to obtain all implied facts:")
-        lines.extend(reasoning)
+        lines.extend(self.reasoning_process)
+        lines.append("Finish reasoning")
+        return '\n'.join(lines)
+
+    def build_proof_string(self, derivations):
+        """
+        derivations: (name, args) -> (rule name, premise facts) recorded while running (see proof_dag)
+
+        the derivations of the query facts (self.proof == 'query') or of all implied facts ('closure'), shown
+        with the predicates, facts and rules they use only
+        """
+        goals = [(self.query.predicate, (parse_data(self.query.subject), label))
+                 for label in dict.fromkeys(self.query_labels)]
+        facts = support(derivations, goals) if self.proof == 'query' else list(derivations)
+
+        known = self.native_facts if self.backend != 'pyke' else self.pyke_facts
+        fact_lines = {}  # (name, args) -> line of the fact, empty for facts compiled from facts.kfb
+        for fact, atom in zip(known or (), self.ground_facts(self.program)):
+            fact_lines.setdefault(fact, atom.line)
+        used_facts = premises_used(derivations, facts)
+        if self.proof == 'query':
+            # a query answered by a fact of the program
+            used_facts.update(goal for goal in goals if goal in fact_lines)
+        used_rules = rules_used(derivations, facts)
+        names = {name for name, _ in used_facts} | {name for name, _ in facts}
+
+        self.reasoning_process = render_proof(derivations, facts)
+        if self.proof == 'query':
+            self.reasoning_process.append(
+                "Query facts: " + (', '.join(format_fact(*goal) for goal in goals) if goals else "None"))
+        else:
+            self.reasoning_process.append(render_new_facts(derivations))
+        lines = []
+        lines.append("We first define following predicates and corresponding natural language explanations:")
+        for p in self.program.predicates:
+            if p.name in names:
+                lines.append(f"  {p.line}")
+        lines.append("We have following known facts from the context:")
+        for fact, line in fact_lines.items():
+            if fact in used_facts:
+                lines.append(f"  {line}")
+        for fact in sorted(format_fact(*fact) for fact in used_facts if fact not in fact_lines):
+            lines.append(f"  {fact}")
+        lines.append("We have following known rules from the context:")
+        for i, r in enumerate(self.program.rules):
+            if f"rule{i+1}" in used_rules:
+                lines.append(f"  rule{i+1}: {r.text}")
+        if self.proof == 'query':
+            lines.append("Now begin reasoning to obtain the query facts:")
+        else:
+            lines.append("Now begin reasoning to obtain all implied facts:")
+        lines.extend(self.reasoning_process)
         lines.append("Finish reasoning")
         return '\n'.join(lines)
 
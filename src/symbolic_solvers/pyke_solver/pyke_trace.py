@@ -1,15 +1,38 @@
+"""
+trace of Pyke's forward chaining, recorded by wrappers around a few Pyke methods
+
+the wrappers record into the PykeTracer of the current context, which tracing() sets for the duration of
+one run: runs in different threads (or asyncio tasks) keep separate traces. They are only installed while a
+tracing() is open in the process, so answer-only runs call Pyke's own methods; one that overlaps with a
+traced run in another thread goes through the wrappers, which then only cost a context variable lookup
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
 from pyke import fc_rule, contexts, knowledge_engine, fact_base
 
+from symbolic_solvers.pyke_solver.trace_events import BIND, FINISH, KNOWN_FACT, NEW_FACT, REUSE, UNBIND, USE
+
+# bound values taken as they are, anything else (pattern variables, structured data) is converted at bind time
+_PLAIN_VALUES = (str, bool, int, float, type(None))
+
+
 class PykeTracer:
-    def __init__(self):
-        self.events = []
-        self.new_facts = set()
-        self.rule_map = {}
+    def __init__(self, deadline=None):
+        self.events = []        # see trace_events, rendered by the caller
+        self.new_facts = set()  # {(name, args)}
+        self.derivations = {}   # (name, args) -> (rule name, premise facts), as ForwardChainingEngine.derivations
         self.used = set()
         self.active_rule = None
-        self.patched = False
+        # [rule, context the rule last bound a variable in], one per firing rule, innermost last
+        self.frames = []
+        self.deadline = deadline  # time.monotonic() value after which rule firing is aborted
 
-tracer = PykeTracer()
+_current_tracer = contextvars.ContextVar('pyke_tracer', default=None)
+_patch_lock = threading.Lock()
+_open_tracings = 0  # tracing() contexts open in the process, the wrappers are installed while there is one
 
 # store original functions
 _orig_fc_run = fc_rule.fc_rule.run
@@ -19,39 +42,61 @@ _orig_unbind = contexts.simple_context._unbind
 _orig_add_case = fact_base.fact_list.add_case_specific_fact
 
 
-def _rule_start(rule):
+def _rule_start(tracer, rule):
+    # cooperative cancellation, checked each time a rule fires
+    if tracer.deadline is not None and time.monotonic() > tracer.deadline:
+        raise TimeoutError('time budget exhausted')
     name = rule.name
-    text = tracer.rule_map.get(name, '')
-    typ = 'Use' if name not in tracer.used else 'Reuse'
-    tracer.events.append(f"{typ} {name}: {text}")
+    tracer.events.append((USE if name not in tracer.used else REUSE, name))
     tracer.used.add(name)
     tracer.active_rule = name
+    tracer.frames.append([rule, None])
 
-def _rule_end(rule):
-    tracer.events.append(f"Finish implied with {rule.name}")
+def _rule_end(tracer, rule):
+    tracer.events.append((FINISH, rule.name))
     tracer.active_rule = None
+    tracer.frames.pop()
+
+
+def _premises(rule, context):
+    """the facts the premises of `rule` matched, read from the variables bound in `context`"""
+    if context is None:
+        context = contexts.simple_context()  # a rule without variables, its patterns are literals
+    return tuple((fact_name, tuple(pattern.as_data(context) for pattern in patterns))
+                 for _, fact_name, patterns, _ in rule.foreach_facts)
 
 
 def run_patch(self):
-    _rule_start(self)
+    tracer = _current_tracer.get()
+    if tracer is None:
+        return _orig_fc_run(self)
+    _rule_start(tracer, self)
     try:
         return _orig_fc_run(self)
     finally:
-        _rule_end(self)
+        _rule_end(tracer, self)
 
 
 def new_fact_patch(self, fact_args, n):
-    _rule_start(self)
+    tracer = _current_tracer.get()
+    if tracer is None:
+        return _orig_fc_new_fact(self, fact_args, n)
+    _rule_start(tracer, self)
     try:
         return _orig_fc_new_fact(self, fact_args, n)
     finally:
-        _rule_end(self)
+        _rule_end(tracer, self)
 
 
 def bind_patch(self, var_name, var_context, val, val_context=None):
     new = _orig_bind(self, var_name, var_context, val, val_context)
-    if tracer.active_rule and new and not var_name.startswith('_'):
-        if hasattr(val, 'name'):
+    tracer = _current_tracer.get()
+    if tracer is not None and tracer.frames:
+        tracer.frames[-1][1] = self
+    if tracer is not None and tracer.active_rule and new and not var_name.startswith('_'):
+        if type(val) in _PLAIN_VALUES:
+            value = val
+        elif hasattr(val, 'name'):
             value = f"${val.name}"
         elif hasattr(val, 'as_data'):
             try:
@@ -60,45 +105,76 @@ def bind_patch(self, var_name, var_context, val, val_context=None):
                 value = str(val)
         else:
             value = val
-        tracer.events.append(f"Bind ${var_name} to '{value}'")
+        tracer.events.append((BIND, var_name, value))
     return new
 
 
 def unbind_patch(self, var_name):
-    if tracer.active_rule and not var_name.startswith('_'):
-        tracer.events.append(f"Unbind ${var_name}")
+    tracer = _current_tracer.get()
+    if tracer is not None and tracer.active_rule and not var_name.startswith('_'):
+        tracer.events.append((UNBIND, var_name))
     return _orig_unbind(self, var_name)
 
 def add_case_patch(self, args):
-    known = args in self.universal_facts or args in self.case_specific_facts
-    if tracer.active_rule:
-        fact_str = f"{self.name}(" + ', '.join(repr(a) for a in args) + ")"
-        if known:
-            tracer.events.append(f"Obtain an already known or implied fact: {fact_str}")
-        else:
-            tracer.events.append(f"Obtain a new implied fact: {fact_str}")
-            tracer.new_facts.add(fact_str)
+    tracer = _current_tracer.get()
+    if tracer is not None:
+        known = args in self.universal_facts or args in self.case_specific_facts
+        if tracer.active_rule:
+            if known:
+                tracer.events.append((KNOWN_FACT, self.name, args))
+            else:
+                tracer.events.append((NEW_FACT, self.name, args))
+                tracer.new_facts.add((self.name, args))
+        if not known and tracer.frames:
+            rule, context = tracer.frames[-1]
+            try:
+                tracer.derivations[self.name, args] = (rule.name, _premises(rule, context))
+            except Exception:
+                pass  # a premise pattern as_data cannot rebuild, the fact is left without a proof
     return _orig_add_case(self, args)
 
 
-def patch_pyke(rule_map):
-    tracer.events.clear()
-    tracer.new_facts.clear()
-    tracer.used.clear()
-    tracer.rule_map = rule_map
-    fc_rule.fc_rule.run = run_patch
-    fc_rule.fc_rule.new_fact = new_fact_patch
-    contexts.simple_context.bind = bind_patch
-    contexts.simple_context._unbind = unbind_patch
-    fact_base.fact_list.add_case_specific_fact = add_case_patch
-    tracer.patched = True
-
-
-def unpatch_pyke():
-    if tracer.patched:
+def install_patches():
+    """wrap the Pyke methods the trace is recorded from, unless an open tracing() did already"""
+    global _open_tracings
+    with _patch_lock:
+        _open_tracings += 1
+        if _open_tracings > 1:
+            return
+        fc_rule.fc_rule.run = run_patch
+        fc_rule.fc_rule.new_fact = new_fact_patch
+        contexts.simple_context.bind = bind_patch
+        contexts.simple_context._unbind = unbind_patch
+        fact_base.fact_list.add_case_specific_fact = add_case_patch
+
+
+def uninstall_patches():
+    """restore the original Pyke methods once no tracing() is open any more"""
+    global _open_tracings
+    with _patch_lock:
+        _open_tracings -= 1
+        if _open_tracings > 0:
+            return
         fc_rule.fc_rule.run = _orig_fc_run
         fc_rule.fc_rule.new_fact = _orig_fc_new_fact
         contexts.simple_context.bind = _orig_bind
         contexts.simple_context._unbind = _orig_unbind
         fact_base.fact_list.add_case_specific_fact = _orig_add_case
-        tracer.patched = False
+
+
+@contextmanager
+def tracing(deadline=None):
+    """
+    record the Pyke rules run in the current context into a fresh PykeTracer, which is yielded
+
+    Args:
+        deadline (float): time.monotonic() value after which firing a rule raises TimeoutError
+    """
+    install_patches()
+    tracer = PykeTracer(deadline)
+    token = _current_tracer.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _current_tracer.reset(token)
+        uninstall_patches()
@@ -0,0 +1,47 @@
+"""
+compact event log of the LP reasoning trace
+
+pyke_trace (for the Pyke engine), ForwardChainingEngine and UnaryBitsetEngine append one tuple per event,
+`(code, ...)`, holding the rule name, variable name, value or fact arguments the engine already has at
+hand; the text of the trace is only rendered from them when the reasoning string is built
+"""
+
+# (USE | REUSE | FINISH, rule name), (BIND, variable name, value), (UNBIND, variable name),
+# (NEW_FACT | KNOWN_FACT, fact name, args)
+USE, REUSE, FINISH, BIND, UNBIND, NEW_FACT, KNOWN_FACT = range(7)
+
+
+def format_fact(name, args):
+    return f"{name}(" + ', '.join(repr(a) for a in args) + ")"
+
+
+def render_event(event, rule_map):
+    code = event[0]
+    if code == BIND:
+        return f"Bind ${event[1]} to '{event[2]}'"
+    if code == UNBIND:
+        return f"Unbind ${event[1]}"
+    if code == NEW_FACT:
+        return f"Obtain a new implied fact: {format_fact(event[1], event[2])}"
+    if code == KNOWN_FACT:
+        return f"Obtain an already known or implied fact: {format_fact(event[1], event[2])}"
+    if code == FINISH:
+        return f"Finish implied with {event[1]}"
+    typ = 'Use' if code == USE else 'Reuse'
+    return f"{typ} {event[1]}: {rule_map.get(event[1], '')}"
+
+
+def render_events(events, rule_map):
+    """
+    Args:
+        events: [(code, ...)]
+        rule_map (dict): rule name -> rule text shown in `Use` events
+    """
+    return [render_event(event, rule_map) for event in events]
+
+
+def render_new_facts(new_facts):
+    """the closing line of the trace, new_facts: {(fact name, args)}"""
+    if new_facts:
+        return "All newly implied Facts: " + ', '.join(sorted(format_fact(name, args) for name, args in new_facts))
+    return "All newly implied Facts: None"
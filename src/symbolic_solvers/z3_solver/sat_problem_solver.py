@@ -1,3 +1,4 @@
+import asyncio
 from collections import OrderedDict
 try:
     from .code_translator import *
@@ -7,13 +8,28 @@ import subprocess
 from subprocess import check_output
 from os.path import join
 import os
+import time
 
 class LSAT_Z3_Program:
-    def __init__(self, logic_program:str, dataset_name:str) -> None:
+    def __init__(self, logic_program:str, dataset_name:str, cache_tag=None, timeout=None) -> None:
+        """
+        Args:
+            logic_program (str): SL, including Declarations, Constraints, Options
+            dataset_name (str): dataset name
+            cache_tag (str): optional suffix for a private cache directory, used when several
+                processes run Z3 programs side by side
+            timeout (float): optional time budget in seconds, it can only shorten the 10s limit of the run
+        """
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.timings = {}  # seconds spent per stage
         self.logic_program = logic_program
         try:
+            start = time.perf_counter()
             self.parse_logic_program()
+            self.timings['parse'] = time.perf_counter() - start
+            start = time.perf_counter()
             self.standard_code = self.to_standard_code()
+            self.timings['translate'] = time.perf_counter() - start
         except Exception as e:
             self.standard_code = None
             self.flag = False
@@ -22,10 +38,12 @@ class LSAT_Z3_Program:
         self.flag = True
         self.dataset_name = dataset_name
 
-        # create the folder to save the Pyke program
-        cache_dir = os.path.join(os.path.dirname(__file__), '.cache_program')
+        # create the folder to save the Z3 program
+        # (kept as a sibling of z3_solver/.cache_program so tmp.py can still import proof_pretty)
+        suffix = f'_{cache_tag}' if cache_tag else ''
+        cache_dir = os.path.join(os.path.dirname(__file__), '.cache_program' + suffix)
         if not os.path.exists(cache_dir):
-            os.makedirs(cache_dir)
+            os.makedirs(cache_dir, exist_ok=True)
         self.cache_dir = cache_dir
 
     def parse_logic_program(self):
@@ -169,20 +187,78 @@ class LSAT_Z3_Program:
 
         return CodeTranslator.assemble_standard_code(declaration_lines, pre_condidtion_lines, option_blocks)
     
+    def run_timeout(self):
+        """time limit of the tmp.py run, None once the time budget is spent"""
+        timeout = 10.0
+        if self.deadline is not None:
+            timeout = min(timeout, self.deadline - time.monotonic())
+        return timeout if timeout > 0 else None
+
     def execute_program(self):
+        timeout = self.run_timeout()
+        if timeout is None:
+            return None, 'time budget exhausted', ''
         filename = join(self.cache_dir, f'tmp.py')
         with open(filename, "w") as f:
             f.write(self.standard_code)
+        start = time.perf_counter()
         try:
             output = check_output([
                 "python",
                 filename
-            ], stderr=subprocess.STDOUT, timeout=10.0, cwd=self.cache_dir)
+            ], stderr=subprocess.STDOUT, timeout=timeout, cwd=self.cache_dir)
         except subprocess.CalledProcessError as e:
             outputs = e.output.decode("utf-8").strip()
             return None, outputs, ''
         except subprocess.TimeoutExpired:
             return None, 'TimeoutError', ''
+        finally:
+            self.timings['subprocess'] = time.perf_counter() - start
+        return self.timed_parse_output(output)
+
+    async def async_execute_program(self):
+        """
+        Same as `execute_program`, but tmp.py runs as an asyncio subprocess so that it can overlap
+        with the other solvers of an example.
+        """
+        timeout = self.run_timeout()
+        if timeout is None:
+            return None, 'time budget exhausted', ''
+        filename = join(self.cache_dir, f'tmp.py')
+        with open(filename, "w") as f:
+            f.write(self.standard_code)
+        start = time.perf_counter()
+        proc = await asyncio.create_subprocess_exec(
+            "python", filename,
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, cwd=self.cache_dir)
+        try:
+            output, _ = await asyncio.wait_for(proc.communicate(), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            try:
+                proc.kill()
+            except ProcessLookupError:  # already exited
+                pass
+            await proc.wait()
+            if isinstance(e, asyncio.TimeoutError):
+                return None, 'TimeoutError', ''
+            raise
+        finally:
+            self.timings['subprocess'] = time.perf_counter() - start
+        if proc.returncode != 0:
+            return None, output.decode("utf-8").strip(), ''
+        return self.timed_parse_output(output)
+
+    def timed_parse_output(self, output):
+        start = time.perf_counter()
+        try:
+            return self.parse_output(output)
+        finally:
+            self.timings['proof_filter'] = time.perf_counter() - start
+
+    def parse_output(self, output):
+        """
+        turn the raw stdout of tmp.py into (answer lines, error message, proof text)
+        """
         output = output.decode("utf-8").strip()
         result_lines = output.splitlines()
 
@@ -0,0 +1,193 @@
+"""
+synthetic logic programs in the four input formats (LP, FOL, CSP, SAT) at controlled sizes
+
+every generator is deterministic given its seed and returns the program together with the option a
+correct solver has to answer, so a benchmark can also check that the answers stay right
+"""
+import random
+import string
+
+
+def _alpha(i):
+    """0 -> 'a', 25 -> 'z', 26 -> 'ba', ... (the CSP parser only accepts letters and '_' in names)"""
+    letters = string.ascii_lowercase
+    name = letters[i % 26]
+    while i >= 26:
+        i = i // 26
+        name = letters[i % 26] + name
+    return name
+
+
+def generate_lp(n_entities=4, n_predicates=6, n_rules=6, depth=3, seed=0):
+    """
+    Pyke program over unary predicates: a chain of `depth` rules leads from a fact about the first entity
+    to the queried predicate, the other rules and facts are random noise
+
+    returns: (program, expected option), the option is 'A' if the query holds and 'B' otherwise
+    """
+    rng = random.Random(seed)
+    n_predicates = max(n_predicates, depth + 1)
+    n_rules = max(n_rules, depth)
+    predicates = ['P' + _alpha(i) for i in range(n_predicates)]
+    entities = ['E' + _alpha(i) for i in range(n_entities)]
+    chain, noise = predicates[:depth + 1], predicates[depth + 1:] or predicates
+
+    lines = ['Predicates:']
+    lines += [f'{p}($x, bool) ::: Is x {p.lower()}?' for p in predicates]
+
+    lines.append('Facts:')
+    lines.append(f'{chain[0]}({entities[0]}, True) ::: {entities[0]} is {chain[0].lower()}.')
+    for entity in entities:
+        for p in rng.sample(noise, k=min(2, len(noise))):
+            lines.append(f'{p}({entity}, True) ::: {entity} is {p.lower()}.')
+
+    lines.append('Rules:')
+    for a, b in zip(chain, chain[1:]):
+        lines.append(f'{a}($x, True) >>> {b}($x, True) ::: All {a.lower()} things are {b.lower()}.')
+    for _ in range(n_rules - depth):
+        a, b = rng.sample(noise, k=2) if len(noise) > 1 else (noise[0], noise[0])
+        c = rng.choice(noise)
+        lines.append(f'{a}($x, True) && {b}($x, True) >>> {c}($x, True) ::: '
+                     f'{a.lower()}, {b.lower()} things are {c.lower()}.')
+
+    holds = rng.random() < 0.5
+    lines.append('Query:')
+    lines.append(f'{chain[-1]}({entities[0]}, {holds}) ::: Is {entities[0]} {chain[-1].lower()}?')
+    return '\n'.join(lines), 'A' if holds else 'B'
+
+
+def generate_fol(n_premises=5, nesting=1, seed=0):
+    """
+    FOL program whose premises are a chain of implications, each quantified over `nesting` variables
+    (the extra variables are linked through a binary relation), plus the facts that start the chain
+
+    returns: (program, expected option), 'A' for True, 'B' for False and 'C' for Unknown
+    """
+    rng = random.Random(seed)
+    variables = 'xyzuvw'[:max(1, min(nesting, 6))]
+    n_links = max(1, n_premises - (2 if nesting > 1 else 1))
+    predicates = ['F' + _alpha(i) for i in range(n_links + 1)]
+    constant = 'c' + _alpha(rng.randrange(26))
+
+    lines = ['Predicates:']
+    lines += [f'{p}(x) ::: x is {p.lower()}.' for p in predicates]
+    lines.append('Rel(x, y) ::: x is related to y.')
+    lines.append('Other(x) ::: x is other.')
+
+    lines.append('Premises:')
+    lines.append(f'{predicates[0]}({constant}) ::: {constant} is {predicates[0].lower()}.')
+    if nesting > 1:
+        lines.append(f'Rel({constant}, {constant}) ::: {constant} is related to itself.')
+    quantifiers = ' '.join(f'∀{v}' for v in variables)
+    links = ' ∧ '.join(f'Rel({a}, {b})' for a, b in zip(variables, variables[1:]))
+    for a, b in zip(predicates, predicates[1:]):
+        body = f'{a}(x) ∧ {links}' if links else f'{a}(x)'
+        lines.append(f'{quantifiers} (({body}) → {b}(x)) ::: All {a.lower()} things are {b.lower()}.')
+
+    answer = rng.choice(['A', 'B', 'C'])
+    conclusion = {'A': f'{predicates[-1]}({constant})',
+                  'B': f'¬{predicates[-1]}({constant})',
+                  'C': f'Other({constant})'}[answer]
+    lines.append('Conclusion:')
+    lines.append(f'{conclusion} ::: Is the conclusion true?')
+    return '\n'.join(lines), answer
+
+
+def generate_csp(n_variables=5, domain_size=5, seed=0):
+    """
+    CSP program with one pinned variable, an ordering chain over half of the variables and, when the
+    domain is large enough, an all-different constraint; the number of solutions grows with both sizes
+
+    returns: (program, expected option)
+    """
+    rng = random.Random(seed)
+    n_variables = max(2, n_variables)
+    domain_size = max(2, domain_size)
+    names = ['item_' + _alpha(i) for i in range(n_variables)]
+    values = list(range(1, domain_size + 1))
+    pinned, pinned_value = names[0], rng.choice(values)
+
+    lines = ['Domain:', f'1: leftmost', f'{domain_size}: rightmost', 'Variables:']
+    lines += [f'{name} [IN] {values}' for name in names]
+
+    lines.append('Constraints:')
+    lines.append(f'{pinned} == {pinned_value} ::: {pinned} is at position {pinned_value}.')
+    chain = names[1:1 + n_variables // 2]
+    for a, b in zip(chain, chain[1:]):
+        lines.append(f'{a} < {b} ::: {a} is to the left of {b}.')
+    if n_variables <= domain_size:
+        lines.append(f'AllDifferentConstraint([{", ".join(names)}]) ::: All items have different positions.')
+
+    # only the pinned variable has a single value over all solutions
+    n_options = min(5, n_variables)
+    options = [pinned] + rng.sample(names[1:], k=n_options - 1)
+    rng.shuffle(options)
+    lines.append('Query:')
+    for letter, name in zip('ABCDE', options):
+        lines.append(f'{letter}) {name} == {pinned_value} ::: {name} is at position {pinned_value}.')
+    return '\n'.join(lines), 'ABCDE'[options.index(pinned)]
+
+
+def generate_sat(n_people=5, n_slots=5, n_options=5, seed=0):
+    """
+    Z3 program assigning `n_people` to `n_slots`, with one assignment fixed by a constraint and slots
+    kept distinct when there are enough of them; exactly one option is valid
+
+    returns: (program, expected option)
+    """
+    rng = random.Random(seed)
+    n_people = max(2, n_people)
+    n_slots = max(2, n_slots)
+    n_options = max(2, min(5, n_options, n_people))
+    people = ['P' + _alpha(i) for i in range(n_people)]
+    fixed, fixed_slot = rng.choice(people), rng.randint(1, n_slots)
+
+    lines = ['# Declarations']
+    lines.append(f'people = EnumSort([{", ".join(people)}])')
+    lines.append(f'slots = EnumSort([{", ".join(str(i) for i in range(1, n_slots + 1))}])')
+    lines.append('assigned = Function([people] -> [slots])')
+
+    lines.append('')
+    lines.append('# Constraints')
+    if n_people <= n_slots:
+        lines.append('Distinct([p:people], assigned(p)) ::: no two people share a slot')
+    lines.append(f'assigned({fixed}) == {fixed_slot} ::: {fixed} is assigned to slot {fixed_slot}')
+
+    options = [fixed] + rng.sample([p for p in people if p != fixed], k=n_options - 1)
+    rng.shuffle(options)
+    lines.append('')
+    lines.append('# Options')
+    lines.append(f'Question ::: Who must be assigned to slot {fixed_slot}?')
+    for letter, person in zip('ABCDE', options):
+        lines.append(f'is_valid(assigned({person}) == {fixed_slot}) ::: ({letter})')
+    return '\n'.join(lines), 'ABCDE'[options.index(fixed)]
+
+
+GENERATORS = {
+    'LP': generate_lp,
+    'FOL': generate_fol,
+    'CSP': generate_csp,
+    'SAT': generate_sat,
+}
+
+
+def generate_examples(n_examples, sizes=None, seed=0):
+    """
+    examples in the input format of logic_inference.py, each holding one program per solver
+
+    Args:
+        sizes (dict): keyword arguments per solver key for the generators above, e.g. {'LP': {'depth': 5}}
+    returns:
+        list of examples, their 'answer' field maps each solver key to the expected option
+    """
+    sizes = sizes or {}
+    examples = []
+    for i in range(n_examples):
+        example = {'id': f'synthetic_{i:05d}', 'context': '', 'question': '', 'options': []}
+        answers = {}
+        for key, generator in GENERATORS.items():
+            program, answers[key] = generator(seed=seed * 100003 + i, **sizes.get(key, {}))
+            example[key] = [program]
+        example['answer'] = answers
+        examples.append(example)
+    return examples
@@ -0,0 +1,95 @@
+import itertools
+import random
+import re
+
+import pytest
+
+from conftest import fol_formulas
+from symbolic_solvers.fol_solver.fol_parser import FOL_Parser
+
+nltk = pytest.importorskip('nltk')
+
+# the grammar the formulas were parsed with by nltk's ChartParser, before the linear-time parser
+CFG_TEMPLATE = """
+S -> F | Q F | '¬' S | '(' S ')'
+Q -> QUANT VAR | QUANT VAR Q
+F -> '¬' '(' F ')' | '(' F ')' | F OP F | L
+OP -> '⊕' | '∨' | '∧' | '→' | '↔'
+L -> '¬' PRED '(' TERMS ')' | PRED '(' TERMS ')'
+TERMS -> TERM | TERM ',' TERMS
+TERM -> CONST | VAR
+QUANT -> '∀' | '∃'
+"""
+OPS = ['⊕', '∨', '∧', '→', '↔', '∀', '∃', '¬', '(', ')', ',']
+SYMBOL_REG = re.compile(r'[^⊕∨∧→↔∀∃¬(),]+')
+
+
+def cfg_msplit(s):
+    """FOL_Parser.msplit as it was: the tokens and the normalized text"""
+    for op in OPS:
+        s = s.replace(op, ' %s ' % op)
+    r = [e.replace('\'', '') for e in s.split()]
+    r = [e for e in r if e != '']
+    res, words = [], []
+    for e in r:
+        if len(e) > 1 and SYMBOL_REG.match(e):
+            words.append(e[0].upper() + e[1:])
+        else:
+            res.extend([''.join(words), e] if words else [e])
+            words = []
+    if words:
+        res.append(''.join(words))
+    text = []
+    for ind, e in enumerate(r):
+        if re.match(r'[⊕∨∧→↔]', e):
+            text.append(' %s ' % e)
+        elif re.match(r',', e):
+            text.append('%s ' % e)
+        elif len(e) == 1 and re.match(r'\w', e):
+            text.append('%s ' % e if ind > 0 and r[ind - 1] in ('∃', '∀') else e)
+        else:
+            text.append(e)
+    return res, ''.join(text)
+
+
+def cfg_tree(formula):
+    tokens, _ = cfg_msplit(formula)
+    symbols = ' | '.join("'%s'" % s for s in set(tokens) if SYMBOL_REG.match(s))
+    grammar = nltk.CFG.fromstring(CFG_TEMPLATE + f'VAR -> {symbols}\nPRED -> {symbols}\nCONST -> {symbols}')
+    return nltk.ChartParser(grammar).parse_one(tokens)
+
+
+def mutations(formula, rng):
+    """`formula` with a bracket, operator or negation dropped or added"""
+    for _ in range(3):
+        i = rng.randrange(len(formula))
+        yield formula[:i] + formula[i + 1:]
+        yield formula[:i] + rng.choice(['(', ')', '¬', ' ∧ ', '∀x ']) + formula[i:]
+
+
+def assert_same_as_cfg(parser, formula):
+    expected = cfg_tree(formula)
+    tree = parser.parse_text_FOL_to_tree(formula)
+    assert str(tree) == str(expected), formula
+    if tree is not None:
+        assert parser.symbol_resolution(tree) == parser.symbol_resolution(expected), formula
+    assert parser.msplit(formula) == cfg_msplit(formula), formula
+
+
+def test_parses_the_formulas_as_the_cfg():
+    parser, rng = FOL_Parser(), random.Random(3)
+    for formula in fol_formulas():
+        assert_same_as_cfg(parser, formula)
+        for mutated in mutations(formula, rng):
+            assert_same_as_cfg(parser, mutated)
+
+
+def test_parses_every_short_formula_as_the_cfg():
+    # every string of up to 5 units: an atom, negation, brackets, binary operators and a quantifier; with no
+    # symbol at all the grammar had empty VAR, PRED and CONST rules, which nltk read as matching nothing
+    parser = FOL_Parser()
+    units = ['Red(x, Anne)', '¬', '(', ')', ' → ', '∀x ', ' ∨ ']
+    for n in range(1, 6):
+        for seq in itertools.product(units[:6] if n == 5 else units, repeat=n):
+            if units[0] in seq or units[5] in seq:
+                assert_same_as_cfg(parser, ''.join(seq))
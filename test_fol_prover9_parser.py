@@ -0,0 +1,70 @@
+import itertools
+
+import pytest
+from ply import yacc
+
+from conftest import fol_formulas
+from src.symbolic_solvers.fol_solver.Formula import FOL_Formula
+from src.symbolic_solvers.fol_solver.fol_prover9_parser import _LeafLexer, _Prover9Grammar, translate
+
+nltk_logic = pytest.importorskip('nltk.inference.prover9')
+
+
+class _NltkGrammar(_Prover9Grammar):
+    """the grammar as it was before translate(): the rules return nltk logic syntax"""
+    def p_S_quantified_S(self, p):
+        '''expr : QUANT SYMBOL expr'''
+        p[0] = f"{'all' if p[1] == '∀' else 'some'} {p[2]}.({p[3]})"
+
+    def p_S_not(self, p):
+        '''expr : NOT expr'''
+        p[0] = f"not ({p[2]})"
+
+    def p_F_not(self, p):
+        '''F : NOT LPAREN F RPAREN'''
+        p[0] = f"not ({p[3]})"
+
+    def p_F_op(self, p):
+        '''F : F OP F'''
+        if p[2] == "⊕":
+            p[0] = f"(({p[1]}) & not ({p[3]})) | (not ({p[1]}) & ({p[3]}))"
+        else:
+            p[0] = f"({p[1]}) {dict(zip('∨∧→↔', ['|', '&', '->', '<->']))[p[2]]} ({p[3]})"
+
+    def p_L_not(self, p):
+        '''L : NOT SYMBOL LPAREN TERMS RPAREN'''
+        p[0] = f"not {p[2]}({p[4]})"
+
+    def p_TERMS_TERM_TERMS(self, p):
+        '''TERMS : TERM COMMA TERMS'''
+        p[0] = f"{p[1]}, {p[3]}"
+
+
+@pytest.fixture(scope='module')
+def nltk_ladr():
+    """the LADR text of a formula, through nltk logic expressions as the solver used to write it"""
+    parser = yacc.yacc(module=_NltkGrammar(), write_tables=False, debug=False)
+
+    def convert(leaves):
+        formula = parser.parse(lexer=_LeafLexer(leaves))
+        return formula and nltk_logic.convert_to_prover9(nltk_logic.Expression.fromstring(formula))
+    return convert
+
+
+def enumerated_formulas(n):
+    """every formula of up to `n` units: atoms, negation, brackets, binary operators and quantifiers"""
+    units = ['Ab(a, x)', 'A(ab)', '¬', '(', ')', ' ∧ ', ' ⊕ ', ' → ', '∀x ', '∃y ']
+    for length in range(1, n + 1):
+        for seq in itertools.product(units, repeat=length):
+            yield ''.join(seq)
+
+
+def test_translates_to_the_ladr_nltk_wrote(nltk_ladr):
+    translated = 0
+    for formula in itertools.chain(fol_formulas(), enumerated_formulas(5)):
+        fol = FOL_Formula(formula)
+        if fol.is_valid:
+            ladr = translate(fol.tree.leaves())
+            assert ladr == nltk_ladr(fol.tree.leaves()), formula
+            translated += ladr is not None
+    assert translated >= 600
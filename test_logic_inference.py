@@ -0,0 +1,102 @@
+import json
+
+import pytest
+
+from conftest import ROOT
+from logic_inference import LogicInferenceEngine, parse_args
+from result_io import iter_jsonl
+from synthetic_workload import generate_examples
+
+# solvers that run in-process and leave no files in the tree, FOL needs the prover9 binary and SAT writes tmp.py
+SOLVERS = ['LP', 'CSP']
+TIMING_FIELDS = [f'{key}_{field}' for key in SOLVERS for field in ('time_used', 'timings')]
+
+
+@pytest.fixture
+def examples():
+    with open(f'{ROOT}/sample_data/sample_input.json') as f:
+        sample = json.load(f)
+    return [dict(example, id=f"{example['id']}-{i}") for i in range(2) for example in sample]
+
+
+def run_inference(monkeypatch, *argv):
+    # cleanup removes the solver caches of the tree, relative to the working directory
+    monkeypatch.setattr(LogicInferenceEngine, 'cleanup', lambda self: None)
+    engine = LogicInferenceEngine(parse_args(['--solvers', *SOLVERS, *argv]))
+    engine.inference_on_dataset()
+    return engine
+
+
+def without_timings(record):
+    return {field: value for field, value in record.items() if field not in TIMING_FIELDS}
+
+
+def test_resume_redoes_partial_examples_and_leaves_one_record_per_example(tmp_path, monkeypatch, examples):
+    input_file, output_file = tmp_path / 'input.jsonl', tmp_path / 'output.jsonl'
+    input_file.write_text(''.join(json.dumps(example) + '\n' for example in examples))
+    run_inference(monkeypatch, '--input_file', str(input_file), '--output_file', str(output_file))
+    fresh = list(iter_jsonl(str(output_file)))
+
+    # interrupted after the first example, in the middle of the second one, while writing the third
+    partial = {field: value for field, value in fresh[1].items() if not field.startswith('CSP_')}
+    partial['LP_reasoning'] = 'solved before the interruption'
+    output_file.write_text(json.dumps(fresh[0]) + '\n' + json.dumps(partial) + '\n' + json.dumps(fresh[2])[:40])
+    run_inference(monkeypatch, '--input_file', str(input_file), '--output_file', str(output_file), '--resume')
+
+    resumed = list(iter_jsonl(str(output_file)))
+    assert [record['id'] for record in resumed] == [example['id'] for example in examples]
+    assert resumed[0] == fresh[0]
+    assert resumed[1]['LP_reasoning'] == 'solved before the interruption'  # only the missing solver was run
+    assert without_timings(dict(resumed[1], LP_reasoning=fresh[1]['LP_reasoning'])) == without_timings(fresh[1])
+    assert [without_timings(record) for record in resumed[2:]] == [without_timings(record) for record in fresh[2:]]
+
+
+def test_jsonl_run_writes_the_records_of_a_json_run(tmp_path, monkeypatch, examples):
+    (tmp_path / 'input.json').write_text(json.dumps(examples))
+    (tmp_path / 'input.jsonl').write_text(''.join(json.dumps(example) + '\n' for example in examples))
+    for ext in ('json', 'jsonl'):
+        run_inference(monkeypatch, '--input_file', str(tmp_path / f'input.{ext}'),
+                      '--output_file', str(tmp_path / f'output.{ext}'))
+    with open(tmp_path / 'output.json') as f:
+        expected = [without_timings(record) for record in json.load(f)]
+    assert len(expected) == len(examples)
+    assert [without_timings(record) for record in iter_jsonl(str(tmp_path / 'output.jsonl'))] == expected
+
+
+def test_result_cache_answers_reruns_and_misses_changed_programs(tmp_path, monkeypatch):
+    # the programs of the sample examples are all the same, each of these is in the input twice
+    examples = generate_examples(3)
+    examples += [dict(example, id=example['id'] + '-again') for example in examples]
+    input_file, output_file = tmp_path / 'input.json', tmp_path / 'output.json'
+    cache = ['--cache_path', str(tmp_path / 'cache' / 'results.sqlite')]
+    input_file.write_text(json.dumps(examples))
+
+    def run(*argv):
+        engine = run_inference(monkeypatch, '--input_file', str(input_file), '--output_file', str(output_file),
+                               *cache, *argv)
+        with open(output_file) as f:
+            records = [without_timings(record) for record in json.load(f)]
+        stats = engine.result_cache.stats()
+        engine.result_cache.close()
+        return records, stats['hits'], stats['misses']
+
+    n_programs = len(examples) * len(SOLVERS)
+    fresh, hits, misses = run()
+    assert (hits, misses) == (n_programs // 2, n_programs // 2)
+
+    cached, hits_after, misses_after = run()
+    assert cached == fresh
+    assert (hits_after - hits, misses_after - misses) == (n_programs, 0)
+
+    # another LP backend traces differently, its results are cached apart; the CSP ones still hit
+    hits, misses = hits_after, misses_after
+    _, hits_after, misses_after = run('--lp_backend', 'goal')
+    assert (hits_after - hits, misses_after - misses) == (n_programs - len(examples) // 2, len(examples) // 2)
+
+    # line endings and trailing spaces do not change a program, anything else does
+    hits, misses = hits_after, misses_after
+    examples[0]['LP'][0] = examples[0]['LP'][0].replace('\n', ' \r\n')
+    examples[1]['LP'][0] = examples[1]['LP'][0].replace(':::', '::: edited', 1)
+    input_file.write_text(json.dumps(examples))
+    _, hits_after, misses_after = run()
+    assert (hits_after - hits, misses_after - misses) == (n_programs - 1, 1)
@@ -0,0 +1,45 @@
+import random
+
+from symbolic_solvers.pyke_solver.fc_engine import ForwardChainingEngine
+from symbolic_solvers.pyke_solver.goal_directed import unbound_conclusions
+from symbolic_solvers.pyke_solver.lp_session import LPSession
+from symbolic_solvers.pyke_solver.pyke_solver import Pyke_Program
+
+
+def closure(program):
+    engine = ForwardChainingEngine(program.native_facts, program.native_rules)
+    engine.activate()
+    return {(fact_list.name, args) for fact_list in engine.fact_lists.values() for args in fact_list.facts}
+
+
+def interleaved_steps(program, rng):
+    """the facts shuffled and the rules in order (their numbering), as a random sequence of small chunks"""
+    facts = [fact.line.strip() for fact in Pyke_Program.ground_facts(program.program)]
+    rules = [rule.line.strip() for rule in program.program.rules]
+    rng.shuffle(facts)
+    steps = []
+    while facts or rules:
+        add_rules = rules and (not facts or rng.random() < 0.5)
+        chunk = rules if add_rules else facts
+        size = rng.randint(1, 3)
+        steps.append((add_rules, chunk[:size]))
+        del chunk[:size]
+    return steps
+
+
+def test_session_reaches_the_closure_of_the_whole_program(lp_programs):
+    checked = 0
+    for idx, text in enumerate(lp_programs):
+        program = Pyke_Program(text, 'ProofWriter', backend='native', trace=False)
+        answer, error, _ = program.execute_program()
+        if program.backend != 'native' or error or any(map(unbound_conclusions, program.native_rules)):
+            continue  # unsupported by the native engine, or rules the session refuses
+        rng = random.Random(idx)
+        for _ in range(3):
+            session = LPSession('ProofWriter')
+            for add_rules, chunk in interleaved_steps(program, rng):
+                (session.add_rules if add_rules else session.add_facts)(chunk)
+            assert session.facts() == closure(program), text
+            assert session.query(program.query.line.strip()) == answer, text
+        checked += 1
+    assert checked >= 80
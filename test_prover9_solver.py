@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.symbolic_solvers.fol_solver import prover9_solver
+from src.symbolic_solvers.fol_solver.prover9_solver import FOL_Prover9_Program, _race_proofs
+
+HAS_PROVER9 = os.path.exists(os.path.join(prover9_solver.PROVER9_PATH, 'prover9'))
+
+INCONSISTENT = """Premises:
+P(alice) ::: Alice is p.
+¬P(alice) ::: Alice is not p.
+Conclusion:
+Q(alice) ::: Alice is q."""
+
+
+def fake_prover(outcomes):
+    """stand-in for _prove_async, input -> (delay in seconds, proved, log)"""
+    async def prove(p9_input):
+        delay, proved, log = outcomes[p9_input]
+        await asyncio.sleep(delay)
+        return proved, log
+    return prove
+
+
+def test_goal_proof_takes_precedence_over_an_earlier_negation_proof(monkeypatch):
+    monkeypatch.setattr(prover9_solver, '_prove_async', fake_prover({'goal': (0.2, True, 'g'), 'neg': (0, True, 'n')}))
+    assert asyncio.run(_race_proofs('goal', 'neg')) == (0, ['g', None])
+
+
+def test_negation_decides_once_the_goal_run_ends_without_proof(monkeypatch):
+    monkeypatch.setattr(prover9_solver, '_prove_async', fake_prover({'goal': (0.2, False, 'g'), 'neg': (0, True, 'n')}))
+    assert asyncio.run(_race_proofs('goal', 'neg')) == (1, [None, 'n'])
+
+
+def test_negation_proof_is_kept_when_the_budget_runs_out_waiting_for_the_goal(monkeypatch):
+    monkeypatch.setattr(prover9_solver, '_prove_async', fake_prover({'goal': (5, True, 'g'), 'neg': (0, True, 'n')}))
+    assert asyncio.run(_race_proofs('goal', 'neg', timeout=0.2)) == (1, [None, 'n'])
+
+
+def test_race_without_proof_raises_once_the_budget_runs_out(monkeypatch):
+    monkeypatch.setattr(prover9_solver, '_prove_async', fake_prover({'goal': (5, True, 'g'), 'neg': (5, True, 'n')}))
+    with pytest.raises(TimeoutError):
+        asyncio.run(_race_proofs('goal', 'neg', timeout=0.2))
+
+
+@pytest.mark.skipif(not HAS_PROVER9, reason='prover9 binary not built')
+def test_inconsistent_premises_always_prove_the_goal():
+    """both the goal and its negation follow from inconsistent premises, the answer must not depend on timing"""
+    answers = {FOL_Prover9_Program(INCONSISTENT).execute_program()[0] for _ in range(20)}
+    assert answers == {'True'}
+
+
+@pytest.mark.skipif(not HAS_PROVER9, reason='prover9 binary not built')
+def test_execute_program_inside_a_running_loop():
+    async def run():
+        return FOL_Prover9_Program(INCONSISTENT).execute_program()
+    assert asyncio.run(run())[0] == 'True'
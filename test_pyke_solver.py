@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from conftest import PYKE_CACHE_TAG, ROOT, sample_programs
+from symbolic_solvers.pyke_solver.pyke_solver import Pyke_Program
+
+RULES_HEADER = 'We have following known rules from the context:'
+
+
+def listed_sections(program):
+    """the predicates and facts as the solver listed them before the LP parser, one split per section header"""
+    sections = {}
+    for header in ['Query:', 'Rules:', 'Facts:', 'Predicates:']:
+        program, segment = program.split(header)
+        sections[header] = segment.strip().split('\n')
+    return sections['Predicates:'], sections['Facts:']
+
+
+def indent(program):
+    return '\n'.join('    ' + line for line in program.split('\n'))
+
+
+def crlf(program):
+    return program.replace('\n', ' \r\n')
+
+
+def blank_lines(program):
+    return program.replace('\n', '\n\n')
+
+
+def test_reasoning_matches_the_sample_output():
+    with open(f'{ROOT}/sample_data/sample_output.json') as f:
+        expected = [record['LP_reasoning'] for record in json.load(f)]
+    assert [Pyke_Program(program, 'ProofWriter').execute_program()[2] for program in sample_programs('LP')] == expected
+
+
+@pytest.mark.parametrize('layout', [indent, crlf, blank_lines])
+def test_reasoning_lists_predicates_and_facts_as_written(layout):
+    for program in sample_programs('LP'):
+        program = layout(program)
+        reasoning = Pyke_Program(program, 'ProofWriter').execute_program()[2]
+        predicates, facts = listed_sections(program)
+        expected = (['We first define following predicates and corresponding natural language explanations:'] +
+                    [f'  {line}' for line in predicates] +
+                    ['We have following known facts from the context:'] + [f'  {line}' for line in facts])
+        assert reasoning.split('\n' + RULES_HEADER)[0].split('\n') == expected
+
+
+def run(program, **kwargs):
+    answer, error, reasoning = Pyke_Program(program, 'ProofWriter', cache_tag=PYKE_CACHE_TAG, **kwargs).execute_program()
+    return answer, str(error), reasoning
+
+
+def test_native_engine_matches_pyke(lp_programs):
+    for program in lp_programs:
+        assert run(program, backend='native') == run(program, backend='pyke'), program
+
+
+def answer_on(program, backend):
+    """answer and error of an answer-only run, with the backend that ran it (unsupported programs fall back)"""
+    solver = Pyke_Program(program, 'ProofWriter', cache_tag=PYKE_CACHE_TAG, backend=backend, trace=False)
+    answer, error, _ = solver.execute_program()
+    return (answer, str(error)), solver.backend
+
+
+def test_bitset_engine_answers_as_native(lp_programs):
+    ran = 0
+    for program in lp_programs:
+        answer, backend = answer_on(program, 'bitset')
+        assert answer == answer_on(program, 'native')[0], program
+        ran += backend == 'bitset'
+    assert ran >= 40  # the unary theories, the others fall back to the native engine
+
+
+def test_goal_directed_engine_answers_as_native(lp_programs):
+    ran = 0
+    for program in lp_programs:
+        answer, backend = answer_on(program, 'goal')
+        assert answer == answer_on(program, 'native')[0], program
+        ran += backend == 'goal'
+    assert ran >= 60  # programs with unbound conclusions fall back to the native engine
@@ -0,0 +1,56 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from pyke import contexts, fact_base, fc_rule
+
+from conftest import PYKE_CACHE_TAG, sample_programs
+from symbolic_solvers.pyke_solver import pyke_trace
+from symbolic_solvers.pyke_solver.pyke_solver import Pyke_Program
+
+
+def pyke_methods():
+    return (fc_rule.fc_rule.run, fc_rule.fc_rule.new_fact, contexts.simple_context.bind,
+            contexts.simple_context._unbind, fact_base.fact_list.add_case_specific_fact)
+
+
+ORIGINAL_METHODS = (pyke_trace._orig_fc_run, pyke_trace._orig_fc_new_fact, pyke_trace._orig_bind,
+                    pyke_trace._orig_unbind, pyke_trace._orig_add_case)
+
+
+def run_pyke(program, trace):
+    return Pyke_Program(program, 'ProofWriter', cache_tag=PYKE_CACHE_TAG, backend='pyke', trace=trace).execute_program()
+
+
+def test_answer_only_runs_leave_pyke_unpatched(monkeypatch):
+    program = sample_programs('LP')[0]
+    assert run_pyke(program, trace=True)[2]  # a traced run first, its patches must not outlive it
+    assert pyke_methods() == ORIGINAL_METHODS
+
+    seen = []
+    execute = Pyke_Program.execute_program_wo_reasoning
+
+    def spy(self):
+        seen.append(pyke_methods())
+        return execute(self)
+
+    monkeypatch.setattr(Pyke_Program, 'execute_program_wo_reasoning', spy)
+    answer, _, reasoning = run_pyke(program, trace=False)
+    assert answer is not None and reasoning == ''
+    assert seen == [ORIGINAL_METHODS]
+
+
+def test_tracing_patches_pyke_while_open():
+    with pyke_trace.tracing():
+        assert pyke_methods() != ORIGINAL_METHODS
+        with pyke_trace.tracing():
+            pass
+        assert pyke_methods() != ORIGINAL_METHODS  # still open in the outer context
+    assert pyke_methods() == ORIGINAL_METHODS
+
+
+def test_concurrent_traced_runs_keep_separate_traces():
+    programs = sample_programs('LP')
+    serial = [run_pyke(program, trace=True) for program in programs]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        concurrent = list(executor.map(lambda program: run_pyke(program, trace=True), programs * 2))
+    assert concurrent == serial * 2
+    assert pyke_methods() == ORIGINAL_METHODS
@@ -0,0 +1,38 @@
+from result_cache import SolverResultCache, normalize_program, solver_version
+
+PROGRAM = 'Facts:\nBig(Anne, True) ::: Anne is big.\nQuery:\nBig(Anne, True) ::: Anne is big.'
+
+
+def test_keys_ignore_line_endings_and_trailing_spaces_only():
+    key = SolverResultCache.make_key('LP', 'ProofWriter', PROGRAM, 'v1')
+    assert SolverResultCache.make_key('LP', 'ProofWriter', PROGRAM.replace('\n', '  \r\n') + '\n', 'v1') == key
+    assert normalize_program(PROGRAM.replace('\n', '\r\n')) == PROGRAM
+    for other in [('FOL', 'ProofWriter', PROGRAM, 'v1'), ('LP', 'ProntoQA', PROGRAM, 'v1'),
+                  ('LP', 'ProofWriter', PROGRAM.replace('Anne', 'Bob'), 'v1'), ('LP', 'ProofWriter', PROGRAM, 'v2')]:
+        assert SolverResultCache.make_key(*other) != key
+
+
+def test_least_recently_used_results_are_evicted(tmp_path):
+    cache = SolverResultCache(str(tmp_path / 'results.sqlite'), max_bytes=150)
+    outcome = ('A', 'success', '', 'x' * 30)  # about 60 bytes stored
+    cache.put('first', *outcome)
+    cache.put('second', *outcome)
+    assert cache.get('first') == outcome  # now more recently used than `second`
+    cache.put('third', *outcome)
+    assert cache.get('second') is None
+    assert cache.get('first') == cache.get('third') == outcome
+    assert cache.stats()['evictions'] == 1
+    cache.close()
+
+
+def test_editing_a_solver_file_changes_its_version(tmp_path, monkeypatch):
+    package = tmp_path / 'toy_solver'
+    package.mkdir()
+    (package / '__init__.py').write_text('')
+    (package / 'solver.py').write_text('ANSWER = 1\n')
+    (package / 'helper.py').write_text('')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    version = solver_version('toy_solver.solver')
+    assert solver_version('toy_solver.solver') == version
+    (package / 'helper.py').write_text('# a helper of the solver\n')
+    assert solver_version('toy_solver.solver') != version
@@ -0,0 +1,69 @@
+import json
+import types
+
+from result_io import JSONLResultWriter, compact_jsonl, iter_jsonl, load_examples, read_results
+
+
+def write_lines(path, records):
+    path.write_text(''.join(json.dumps(record) + '\n' for record in records))
+
+
+def test_jsonl_examples_are_read_lazily(tmp_path):
+    path = tmp_path / 'examples.jsonl'
+    write_lines(path, [{'id': 1}, {'id': 2}])
+    examples = load_examples(str(path))
+    assert isinstance(examples, types.GeneratorType)
+    assert list(examples) == [{'id': 1}, {'id': 2}]
+
+
+def test_read_results_drops_a_partially_written_tail(tmp_path):
+    path = tmp_path / 'results.jsonl'
+    write_lines(path, [{'id': 1}, {'id': 2}])
+    complete = path.read_bytes()
+    path.write_bytes(complete + b'{"id": 3, "LP_predicted')
+    assert read_results(str(path)) == [{'id': 1}, {'id': 2}]
+    assert path.read_bytes() == complete + b'{"id": 3, "LP_predicted'  # only repair cuts the file
+    assert read_results(str(path), repair=True) == [{'id': 1}, {'id': 2}]
+    assert path.read_bytes() == complete
+
+
+def test_read_results_stops_at_a_line_that_does_not_parse(tmp_path):
+    path = tmp_path / 'results.jsonl'
+    path.write_text('{"id": 1}\n{"id": 2\n{"id": 3}\n')
+    assert read_results(str(path), repair=True) == [{'id': 1}]
+    assert path.read_text() == '{"id": 1}\n'
+
+
+def test_read_results_of_a_missing_file(tmp_path):
+    assert read_results(str(tmp_path / 'results.jsonl'), repair=True) == []
+
+
+def test_writer_flushes_every_few_records_and_appends(tmp_path):
+    path = tmp_path / 'out' / 'results.jsonl'
+    with JSONLResultWriter(str(path), flush_every=2) as writer:
+        writer.write({'id': 1})
+        assert path.read_text() == ''
+        writer.write({'id': 2})
+        assert list(iter_jsonl(str(path))) == [{'id': 1}, {'id': 2}]
+        writer.write({'id': 3})
+    assert list(iter_jsonl(str(path))) == [{'id': 1}, {'id': 2}, {'id': 3}]
+    with JSONLResultWriter(str(path), append=True) as writer:
+        writer.write({'id': 4})
+    assert [record['id'] for record in iter_jsonl(str(path))] == [1, 2, 3, 4]
+
+
+def test_compact_keeps_the_last_record_of_each_id_at_its_first_place(tmp_path):
+    path = tmp_path / 'results.jsonl'
+    write_lines(path, [{'id': 1, 'v': 'old'}, {'id': 2, 'v': 'done'}, {'id': 3, 'v': 'old'},
+                       {'id': 1, 'v': 'new'}, {'id': 4, 'v': 'done'}, {'id': 3, 'v': 'new'}])
+    assert compact_jsonl(str(path)) == 2
+    assert list(iter_jsonl(str(path))) == [{'id': 1, 'v': 'new'}, {'id': 2, 'v': 'done'}, {'id': 3, 'v': 'new'},
+                                           {'id': 4, 'v': 'done'}]
+
+
+def test_compact_leaves_a_file_without_duplicates_untouched(tmp_path):
+    path = tmp_path / 'results.jsonl'
+    write_lines(path, [{'id': 1}, {'v': 'no id'}, {'v': 'no id'}, {'id': 2}])
+    before = path.read_bytes()
+    assert compact_jsonl(str(path)) == 0
+    assert path.read_bytes() == before